@@ -1,9 +1,12 @@
+from array import array
+import bisect
+import functools
 import gi
 import re
-from collections import OrderedDict
 import logging
 import shlex
 import subprocess
+import weakref
 
 gi.require_version("Gtk", "3.0")
 gi.require_version("GtkSource", "4")
@@ -20,24 +23,34 @@ except ImportError:
     class AIChatWindow: pass
     class MyAIHandler: pass
 
+# Background of secondary cursor selections, rgba(60, 80, 120, 0.6)
+MULTICURSOR_BACKGROUND = Gdk.RGBA(red=60 / 255, green=80 / 255, blue=120 / 255, alpha=0.6)
+
 
 # ############################################################################
 # Helper class for detecting and converting between different casing conventions
 # ############################################################################
 class Casing:
+    __slots__ = ('case', 'separator', 'prefix', 'suffix')
+
     # regexes
     match_surround = re.compile(r'^([_-]*)(.*?)([_-]*)$')
-    match_cases = OrderedDict([
-        ('case', re.compile(r'^([a-z0-9_-]*[a-z]+[a-z0-9_-]*|[a-z][A-Za-z0-9]*)$')),
-        ('CASE', re.compile(r'^[A-Z0-9_-]*[A-Z]+[A-Z0-9_-]*$')),
-        ('Case', re.compile(r'^([\w-]*[A-Z][a-z][\w-]*|[A-Z][a-z][A-Za-z0-9]*)$'))
-    ])
-    match_separators = OrderedDict([
-        (None, re.compile(r'^([A-Z0-9]+|[a-z0-9]+|[A-Z][a-z][a-z0-9]*)$')),
-        ('', re.compile(r'^[A-Za-z0-9]+$')),
-        ('_', re.compile(r'^[\w]+$')),
-        ('-', re.compile(r'^[A-Za-z0-9-]+$'))
-    ])
+    surround_chars = ('_', '-')
+    # one alternation per property, first matching alternative wins; the
+    # name of the matched group is the detected key
+    match_case = re.compile(
+        r'^(?:(?P<case>[a-z0-9_-]*[a-z]+[a-z0-9_-]*|[a-z][A-Za-z0-9]*)'
+        r'|(?P<CASE>[A-Z0-9_-]*[A-Z]+[A-Z0-9_-]*)'
+        r'|(?P<Case>[\w-]*[A-Z][a-z][\w-]*|[A-Z][a-z][A-Za-z0-9]*))$')
+    match_separator = re.compile(
+        r'^(?:(?P<none>[A-Z0-9]+|[a-z0-9]+|[A-Z][a-z][a-z0-9]*)'
+        r'|(?P<joined>[A-Za-z0-9]+)'
+        r'|(?P<underscore>\w+)'
+        r'|(?P<dash>[A-Za-z0-9-]+))$')
+    separator_keys = {'none': None, 'joined': '', 'underscore': '_', 'dash': '-'}
+    # zero-width camelCase word boundaries: 'aB' and 'A|Bc'
+    split_camel = re.compile(r'(?<=[a-z])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])')
+    case_converters = {'case': str.lower, 'CASE': str.upper, 'Case': str.capitalize}
     
     def __init__(self, case=None, separator=None, prefix='', suffix=''):
         self.case = case
@@ -48,63 +61,82 @@ class Casing:
     def is_keyword(self):
         return((self.case is not None) or (self.separator is not None))
     
+    @staticmethod
+    def has_surround(text):
+        return(text.startswith(Casing.surround_chars) or text.endswith(Casing.surround_chars))
+
     def detect(self, text):
-        m = Casing.match_surround.match(text)
-        if (m):
-            self.prefix = m.group(1)
-            text = m.group(2)
-            self.suffix = m.group(3)
-        for (key, pattern) in Casing.match_cases.items():
-            if (pattern.match(text)):
-                self.case = key
-                break
-        for (key, pattern) in Casing.match_separators.items():
-            if (pattern.match(text)):
-                self.separator = key
-                break
+        (self.case, self.separator, self.prefix, self.suffix) = _detect_casing(text)
         return(self)
     
     def split(self, text):
-        m = Casing.match_surround.match(text)
-        if (m):
-            prefix = m.group(1)
-            text = m.group(2)
-            suffix = m.group(3)
+        # detect() already measured the separators surrounding this text
+        if (self.prefix or self.suffix):
+            text = text[len(self.prefix):len(text) - len(self.suffix)]
         if (self.separator == '_'):
             return(tuple(text.split('_')))
         elif (self.separator == '-'):
             return(tuple(text.split('-')))
         elif (self.separator == ''):
-            text = re.sub(r'([a-z])([A-Z])', r'\1,\2', text)
-            text = re.sub(r'([A-Z])([A-Z][a-z])', r'\1,\2', text)
-            return(tuple(text.lower().split(',')))
+            return(tuple(map(str.lower, Casing.split_camel.split(text))))
         else:
             return((text,))
             
     def join(self, words):
-        if (self.case == 'case'):
-            words = map(lambda s: s.lower(), words)
-        elif (self.case == 'CASE'):
-            words = map(lambda s: s.upper(), words)
-        elif (self.case == 'Case'):
-            words = map(lambda s: s.capitalize(), words)
+        convert = Casing.case_converters.get(self.case)
+        words = [convert(word) for word in words] if convert else list(words)
         if ((self.separator == '') and (self.case == 'case')):
-            words = list(words)
-            words[1:] = map(lambda s: s.capitalize(), words[1:])
-        if (self.separator is not None):
-            inner = self.separator.join(words)
-        else:
-            inner = ''.join(words)
+            words[1:] = [word.capitalize() for word in words[1:]]
+        inner = (self.separator or '').join(words)
         return(self.prefix+inner+self.suffix)
 
+# Casing.detect is a pure function of the text; multicursor matching keeps
+# classifying the same identifiers, so results are memoized
+@functools.lru_cache(maxsize=4096)
+def _detect_casing(text):
+    case = separator = None
+    prefix = suffix = ''
+    if (text.isascii() and text.isalnum()):
+        # Single-case ASCII words need no regex: no surround, no separator
+        if (text.islower()):
+            return('case', None, '', '')
+        elif (text.isupper()):
+            return('CASE', None, '', '')
+        elif (text.isdigit()):
+            return(None, None, '', '')
+    m = Casing.match_surround.match(text) if Casing.has_surround(text) else None
+    if (m):
+        prefix = m.group(1)
+        text = m.group(2)
+        suffix = m.group(3)
+    m = Casing.match_case.match(text)
+    if (m):
+        case = m.lastgroup
+    m = Casing.match_separator.match(text)
+    if (m):
+        separator = Casing.separator_keys[m.lastgroup]
+    return(case, separator, prefix, suffix)
+
+# Fuzzy matching scans the buffer once for all (lowercased) spellings of the
+# selection; the leftmost match wins, ties go to the earlier alternative
+@functools.lru_cache(maxsize=64)
+def _alternatives_pattern(alternatives):
+    return(re.compile('|'.join(map(re.escape, alternatives))))
+
 # ############################################################################
 # Helper class to manage a GtkTextTag anchored by GtkTextMarks
 # ############################################################################
 class MarkTag:
+    __slots__ = ('view', 'doc', 'name', '_tag', 'start_mark', 'end_mark')
+
+    # buffer -> {tag name: GtkTextTag}, shared by every MarkTag on that buffer
+    _tag_cache = weakref.WeakKeyDictionary()
+
     def __init__(self, view, name, start_iter, end_iter):
         self.view = view
         self.doc = self.view.get_buffer()
         self.name = name
+        self._tag = None
         self.start_mark = self.doc.create_mark(None, start_iter, True)
         self.end_mark = self.doc.create_mark(None, end_iter, False)
         self.do_move_marks()
@@ -127,15 +159,18 @@ class MarkTag:
         self.doc.delete(start_iter, end_iter)
         self.doc.insert(start_iter, text)
 
-    def move_marks(self, new_start_iter=None, new_end_iter=None):
-        start_iter = self.doc.get_iter_at_mark(self.start_mark)
-        end_iter = self.doc.get_iter_at_mark(self.end_mark)
-        if (((new_start_iter is not None) and (new_start_iter.get_offset() != start_iter.get_offset())) or
-            ((new_end_iter is not None) and (new_end_iter.get_offset() != end_iter.get_offset()))):
-            self.do_move_marks(new_start_iter, new_end_iter)
-
-    def do_move_marks(self, new_start_iter=None, new_end_iter=None):
-        self.remove_tag()
+    def move_marks(self, new_start_iter=None, new_end_iter=None, retag=True):
+        # Marks follow buffer edits, so their current position has to be read
+        # back; only do so for the endpoints being moved
+        if (((new_start_iter is not None) and not new_start_iter.equal(self.get_start_iter())) or
+            ((new_end_iter is not None) and not new_end_iter.equal(self.get_end_iter()))):
+            self.do_move_marks(new_start_iter, new_end_iter, retag)
+
+    def do_move_marks(self, new_start_iter=None, new_end_iter=None, retag=True):
+        # retag=False leaves the tag to the caller, which re-applies it for
+        # many MarkTags at once
+        if (retag):
+            self.remove_tag()
         if (new_start_iter is not None):
             self.doc.move_mark(self.start_mark, new_start_iter)
         if (new_end_iter is not None):
@@ -143,7 +178,8 @@ class MarkTag:
         start_iter = self.doc.get_iter_at_mark(self.start_mark)
         end_iter = self.doc.get_iter_at_mark(self.end_mark)
         if (start_iter.get_offset() != end_iter.get_offset()):
-            self.add_tag()
+            if (retag):
+                self.add_tag()
             self.start_mark.set_visible(False)
         else:
             self.start_mark.set_visible(self.name != 'tracker')
@@ -170,27 +206,39 @@ class MarkTag:
             self.doc.apply_tag(tag, start_iter, end_iter)
 
     def remove_tag(self):
-        if (self.doc.get_tag_table().lookup(self.name) is not None):
+        tag = self.get_tag()
+        if (tag is not None):
             start_iter = self.doc.get_iter_at_mark(self.start_mark)
             end_iter = self.doc.get_iter_at_mark(self.end_mark)
-            self.doc.remove_tag_by_name(self.name, start_iter, end_iter)
+            self.doc.remove_tag(tag, start_iter, end_iter)
 
     def get_tag(self):
-        tag_table = self.doc.get_tag_table()
-        tag = tag_table.lookup(self.name)
+        if self._tag is None:
+            self._tag = MarkTag.get_doc_tag(self.doc, self.name)
+        return self._tag
+
+    @staticmethod
+    def get_doc_tag(doc, name):
+        # One TextTag per buffer and name, shared by every MarkTag and the
+        # match highlighting
+        tags = MarkTag._tag_cache.setdefault(doc, {})
+        if name in tags:
+            return tags[name]
+        tag = doc.get_tag_table().lookup(name)
         if tag is None:
-            if self.name == 'multicursor':
-                tag = self.doc.create_tag(self.name, background="rgba(60, 80, 120, 0.6)")
-            elif self.name == 'multicursor_match':
-                tag = self.doc.create_tag(self.name, underline=Pango.Underline.SINGLE)
-            elif self.name == 'tracker':
-                tag = None
+            if name == 'multicursor':
+                tag = doc.create_tag(name, background_rgba=MULTICURSOR_BACKGROUND)
+            elif name == 'multicursor_match':
+                tag = doc.create_tag(name, underline=Pango.Underline.SINGLE)
+        tags[name] = tag
         return tag
 
 # ############################################################################
 # Helper class to manage a single extra cursor in the document
 # ############################################################################
 class Cursor:
+    __slots__ = ('view', 'doc', 'tag', 'tracker', 'casing', 'clipboard', 'line_offset')
+
     def __init__(self, view, start_iter, end_iter):
         self.view = view
         self.doc = self.view.get_buffer()
@@ -211,21 +259,17 @@ class Cursor:
         if (self.tracker is not None):
             self.tracker.remove()
 
-    def insert(self, start_delta, text):
-        start_iter = self.doc.get_iter_at_offset(self.tag.get_start_iter().get_offset() + start_delta)
-        self.tag.set_capturing_gravity(False)
-        self.doc.insert(start_iter, text)
-        self.tag.set_capturing_gravity(True)
-
     def delete(self, start_delta, end_delta):
-        start_iter = self.doc.get_iter_at_offset(self.tag.get_start_iter().get_offset() + start_delta)
-        end_iter = self.doc.get_iter_at_offset(self.tag.get_end_iter().get_offset() + end_delta)
+        start_iter = self.tag.get_start_iter()
+        start_iter.forward_chars(start_delta)
+        end_iter = self.tag.get_end_iter()
+        end_iter.forward_chars(end_delta)
         had_length = (self.tag.get_length() > 0)
         self.doc.delete(start_iter, end_iter)
         if ((self.tag.get_length() > 0) != had_length):
             self.tag.do_move_marks()
 
-    def move(self, step_size, count, extend_selection):
+    def move(self, step_size, count, extend_selection, retag=True):
         # Get original positions
         start_iter = self.tag.get_start_iter()
         end_iter = self.tag.get_end_iter()
@@ -238,7 +282,7 @@ class Cursor:
             else: # Moving right
                 self.move_iter(end_iter, step_size, count)
             
-            self.tag.move_marks(start_iter, end_iter)
+            self.tag.move_marks(start_iter, end_iter, retag)
 
         else: # Not extending selection (collapsing or moving caret)
             has_selection = start_iter.get_offset() != end_iter.get_offset()
@@ -254,7 +298,7 @@ class Cursor:
             if not has_selection:
                  self.move_iter(new_pos, step_size, count)
 
-            self.tag.move_marks(new_pos, new_pos)
+            self.tag.move_marks(new_pos, new_pos, retag)
 
     def move_iter(self, pos, step_size, count):
         if step_size == Gtk.MovementStep.VISUAL_POSITIONS:
@@ -334,26 +378,45 @@ class MultiCursorUndoAction(UndoAction):
     def __init__(self, dialog):
         self.dialog = dialog
         self.actions = []
+        self.primary_before = None
 
+    def _save_pre_state(self):
         # Save pre-action state (offsets)
-        insert_mark = self.dialog.doc.get_mark("insert")
-        selection_bound_mark = self.dialog.doc.get_mark("selection_bound")
-        self.primary_before = (insert_mark.get_buffer().get_iter_at_mark(insert_mark).get_offset(),
-                               selection_bound_mark.get_buffer().get_iter_at_mark(selection_bound_mark).get_offset())
-        # Use a dictionary to map cursor objects to their state for robustness
-        self.secondary_before = {c: (c.tag.get_start_iter().get_offset(), c.tag.get_end_iter().get_offset()) for c in self.dialog.cursors}
+        self.primary_before = self._primary_offsets()
+        # Cursors and their start/end offsets as parallel sequences
+        self.secondary_before = self._snapshot_cursors()
 
     def add(self, action):
+        # The first edit signal fires before the buffer changes, so the
+        # pre-action state is only captured for actions that edit something
+        if self.primary_before is None:
+            self._save_pre_state()
         self.actions.append(action)
 
+    def _primary_offsets(self):
+        doc = self.dialog.doc
+        return (doc.get_iter_at_mark(self.dialog._insert_mark).get_offset(),
+                doc.get_iter_at_mark(self.dialog._selection_bound_mark).get_offset())
+
+    def _snapshot_cursors(self):
+        cursors = tuple(self.dialog.cursors)
+        starts = array('l', (c.tag.get_start_iter().get_offset() for c in cursors))
+        ends = array('l', (c.tag.get_end_iter().get_offset() for c in cursors))
+        return (cursors, starts, ends)
+
+    def _restore_cursors(self, snapshot):
+        (cursors, starts, ends) = snapshot
+        alive = set(self.dialog.cursors)
+        for (cursor, start_offset, end_offset) in zip(cursors, starts, ends):
+            if cursor in alive: # Check if cursor still exists
+                start_iter = self.dialog.doc.get_iter_at_offset(start_offset)
+                end_iter = self.dialog.doc.get_iter_at_offset(end_offset)
+                cursor.tag.move_marks(start_iter, end_iter)
+
     def save_post_state(self):
         # Save post-action state (offsets)
-        insert_mark = self.dialog.doc.get_mark("insert")
-        selection_bound_mark = self.dialog.doc.get_mark("selection_bound")
-        self.primary_after = (insert_mark.get_buffer().get_iter_at_mark(insert_mark).get_offset(),
-                              selection_bound_mark.get_buffer().get_iter_at_mark(selection_bound_mark).get_offset())
-        # Use a dictionary to map cursor objects to their state for robustness
-        self.secondary_after = {c: (c.tag.get_start_iter().get_offset(), c.tag.get_end_iter().get_offset()) for c in self.dialog.cursors}
+        self.primary_after = self._primary_offsets()
+        self.secondary_after = self._snapshot_cursors()
 
     def undo(self):
         for action in reversed(self.actions):
@@ -362,17 +425,11 @@ class MultiCursorUndoAction(UndoAction):
         # Restore cursors from saved offsets
         primary_insert_iter = self.dialog.doc.get_iter_at_offset(self.primary_before[0])
         primary_select_iter = self.dialog.doc.get_iter_at_offset(self.primary_before[1])
-        self.dialog.doc.move_mark_by_name("insert", primary_insert_iter)
-        self.dialog.doc.move_mark_by_name("selection_bound", primary_select_iter)
-
-        # Restore secondary cursors from the dictionary
-        for cursor, (start_offset, end_offset) in self.secondary_before.items():
-            if cursor in self.dialog.cursors: # Check if cursor still exists
-                start_iter = self.dialog.doc.get_iter_at_offset(start_offset)
-                end_iter = self.dialog.doc.get_iter_at_offset(end_offset)
-                cursor.tag.move_marks(start_iter, end_iter)
+        self.dialog.doc.move_mark(self.dialog._insert_mark, primary_insert_iter)
+        self.dialog.doc.move_mark(self.dialog._selection_bound_mark, primary_select_iter)
+        self._restore_cursors(self.secondary_before)
         
-        self.dialog.view.scroll_to_mark(self.dialog.doc.get_mark("insert"), 0.0, True, 0.5, 0.5)
+        self.dialog.view.scroll_to_mark(self.dialog._insert_mark, 0.0, True, 0.5, 0.5)
 
     def redo(self):
         for action in self.actions:
@@ -381,17 +438,11 @@ class MultiCursorUndoAction(UndoAction):
         # Restore cursors from saved offsets
         primary_insert_iter = self.dialog.doc.get_iter_at_offset(self.primary_after[0])
         primary_select_iter = self.dialog.doc.get_iter_at_offset(self.primary_after[1])
-        self.dialog.doc.move_mark_by_name("insert", primary_insert_iter)
-        self.dialog.doc.move_mark_by_name("selection_bound", primary_select_iter)
-
-        # Restore secondary cursors from the dictionary
-        for cursor, (start_offset, end_offset) in self.secondary_after.items():
-            if cursor in self.dialog.cursors: # Check if cursor still exists
-                start_iter = self.dialog.doc.get_iter_at_offset(start_offset)
-                end_iter = self.dialog.doc.get_iter_at_offset(end_offset)
-                cursor.tag.move_marks(start_iter, end_iter)
+        self.dialog.doc.move_mark(self.dialog._insert_mark, primary_insert_iter)
+        self.dialog.doc.move_mark(self.dialog._selection_bound_mark, primary_select_iter)
+        self._restore_cursors(self.secondary_after)
             
-        self.dialog.view.scroll_to_mark(self.dialog.doc.get_mark("insert"), 0.0, True, 0.5, 0.5)
+        self.dialog.view.scroll_to_mark(self.dialog._insert_mark, 0.0, True, 0.5, 0.5)
 
 
 # ############################################################################
@@ -423,6 +474,7 @@ class UndoManager:
     def _on_end_user_action(self, buf):
         if self.undo_lock: return
         if self.current_action_group and self.current_action_group.actions:
+            self.current_action_group.actions = self._merge_actions(self.current_action_group.actions)
             if isinstance(self.current_action_group, MultiCursorUndoAction):
                 self.current_action_group.save_post_state()
 
@@ -433,15 +485,49 @@ class UndoManager:
                 self.editor.update_undo_redo_sensitivity()
         self.current_action_group = None
 
+    def _merge_actions(self, actions):
+        """Fuses adjacent deletes so undo/redo replays fewer edits. Contiguous
+        inserts are already joined as they are recorded, in _on_insert_text.
+        """
+        merged = []
+        for action in actions:
+            last = merged[-1] if merged else None
+            if isinstance(action, DeleteAction) and isinstance(last, DeleteAction):
+                if action.offset + len(action.text) == last.offset:
+                    # Deleting backwards (e.g. multicursor backspace)
+                    last.offset = action.offset
+                    last.text = action.text + last.text
+                    continue
+                if action.offset == last.offset:
+                    # Deleting forwards from the same position
+                    last.text += action.text
+                    continue
+            merged.append(action)
+        return merged
+
     def _on_insert_text(self, buf, iter, text, length):
         if self.undo_lock or self.current_action_group is None: return
-        action = InsertAction(self.buffer, iter.get_offset(), text)
+        offset = iter.get_offset()
+        actions = self.current_action_group.actions
+        if actions and isinstance(actions[-1], InsertAction):
+            last = actions[-1]
+            if last.offset + len(last.text) == offset:
+                # Contiguous with the previous insert of this action (e.g. a
+                # newline followed by its auto-indent), undo them together
+                last.text += text
+                return
+        action = InsertAction(self.buffer, offset, text)
         self.current_action_group.add(action)
 
     def _on_delete_range(self, buf, start_iter, end_iter):
         if self.undo_lock or self.current_action_group is None: return
-        text = self.buffer.get_text(start_iter, end_iter, False)
-        action = DeleteAction(self.buffer, start_iter.get_offset(), text)
+        start_offset = start_iter.get_offset()
+        if end_iter.get_offset() - start_offset == 1:
+            # Single character (Backspace/Delete), no need to copy out a range
+            text = start_iter.get_char()
+        else:
+            text = self.buffer.get_text(start_iter, end_iter, False)
+        action = DeleteAction(self.buffer, start_offset, text)
         self.current_action_group.add(action)
 
     def undo(self):
@@ -466,6 +552,23 @@ class UndoManager:
 # Main Editor Dialog
 # ############################################################################
 class TextEditorDialog(Gtk.Dialog):
+    # (accelerator, method name) pairs, parsed once per process by _compiled_keymap
+    keymap_spec = (
+        ('<Primary>d', 'match_cursor'),
+        ('<Primary><Shift>d', 'match_cursor_fuzzy'),
+        ('<Primary>u', 'unmatch_cursor'),
+        ('<Primary>Up', 'column_select_up'),
+        ('<Primary>Down', 'column_select_down'),
+        ('Escape', 'clear_cursors'),
+        ('<Primary>z', 'undo'),
+        ('<Primary>y', 'redo'),
+        ('<Primary><Shift>z', 'redo'),
+        ('<Primary>i', 'format_content'),
+        ('<Primary><Shift>v', 'validate_content'),
+    )
+    _keymap_cache = None
+    css_provider = None
+
     def __init__(self, parent=None, ai_handler=None):
         super().__init__(
             title="Text Editor",
@@ -478,36 +581,7 @@ class TextEditorDialog(Gtk.Dialog):
         
         # Style the run button to be green
         style_context = run_button.get_style_context()
-        self.css_provider = Gtk.CssProvider()
-        self.css_provider.load_from_data(b"""
-            .suggested-action { background-color: #4CAF50; color: white; }
-            .ai-chat-window {
-                background-color: rgba(45, 45, 45, 0.95);
-                color: white;
-            }
-            .ai-chat-header {
-                background-color: rgba(255, 255, 255, 0.05);
-                padding: 8px;
-                font-weight: bold;
-                border-bottom: 1px solid rgba(255, 255, 255, 0.1);
-            }
-            .chat-close-button {
-                background: none;
-                border: none;
-                padding: 0;
-            }
-            .user-message {
-                color: #e0e0e0;
-                font-size: small;
-            }
-            .bot-message {
-                color: #a5d6a7; /* A light green for the bot */
-                font-size: small;
-            }
-        """)
-        Gtk.StyleContext.add_provider_for_screen(
-            Gdk.Screen.get_default(), self.css_provider, Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
-        )
+        self._install_css()
         run_button.get_style_context().add_class("suggested-action")
 
         screen = Gdk.Screen.get_default()
@@ -605,6 +679,9 @@ class TextEditorDialog(Gtk.Dialog):
             self.buffer.set_style_scheme(scheme)
 
         self.doc = self.buffer
+        # The buffer's own marks live as long as the buffer, look them up once
+        self._insert_mark = self.doc.get_insert()
+        self._selection_bound_mark = self.doc.get_selection_bound()
         scrolled_window.add(self.view)
         
         # -- AI Chat Window --
@@ -615,32 +692,31 @@ class TextEditorDialog(Gtk.Dialog):
         self.undo_manager.editor = self
 
         # -- Feature Implementation --
-        self._handlers = []
+        self._handlers = {}
+        self._edit_handler_ids = ()
         self._in_user_action = False
         self._is_modifying_programmatically = False
         self._user_actions = []
         self._handled_paste = False
         self.clipboard = ''
         self.cursors = []
+        self._cursors_by_offset = []
         self.matches = []
         self.tracker = None
+        self._casing_cache = (None, None)
+        self._search_text = None
+        self._search_text_stale = True
+        self._last_formatted = None
+        self.buffer.connect("changed", self._on_buffer_changed)
         
-        self.keymap = {
-            '<Primary>d': self.match_cursor,
-            '<Primary><Shift>d': self.match_cursor_fuzzy,
-            '<Primary>u': self.unmatch_cursor,
-            '<Primary>Up': self.column_select_up,
-            '<Primary>Down': self.column_select_down,
-            'Escape': self.clear_cursors,
-            '<Primary>z': self.undo,
-            '<Primary>y': self.redo,
-            '<Primary><Shift>z': self.redo,
-            '<Primary>i': self.format_content,
-            '<Primary><Shift>v': self.validate_content,
-        }
-        self.compile_keymap()
+        self.keymap = {key: getattr(self, name) for (key, name) in self._compiled_keymap().items()}
+        # Most key presses are plain typing, rejected on the keyval alone
+        self._keymap_keyvals = frozenset(keyval for (keyval, mods) in self.keymap)
+        self._default_mod_mask = Gtk.accelerator_get_default_mod_mask()
         self._hook_view_handlers()
         
+        self._undo_sensitive = None
+        self._redo_sensitive = None
         self.update_undo_redo_sensitivity()
         self.connect("destroy", self.on_destroy)
         self.show_all()
@@ -660,8 +736,15 @@ class TextEditorDialog(Gtk.Dialog):
                 self.ai_chat_window.show_all()
 
     def update_undo_redo_sensitivity(self):
-        self.undo_button.set_sensitive(len(self.undo_manager.undo_stack) > 0)
-        self.redo_button.set_sensitive(len(self.undo_manager.redo_stack) > 0)
+        # Only touch the buttons when their state actually flips
+        undo_sensitive = bool(self.undo_manager.undo_stack)
+        redo_sensitive = bool(self.undo_manager.redo_stack)
+        if undo_sensitive != self._undo_sensitive:
+            self.undo_button.set_sensitive(undo_sensitive)
+            self._undo_sensitive = undo_sensitive
+        if redo_sensitive != self._redo_sensitive:
+            self.redo_button.set_sensitive(redo_sensitive)
+            self._redo_sensitive = redo_sensitive
 
     def undo(self, widget=None):
         if self.undo_manager.undo():
@@ -690,6 +773,10 @@ class TextEditorDialog(Gtk.Dialog):
         shell command argument.
         """
         text = self.get_raw_content()
+        if "'" not in text:
+            # Inside single quotes everything but a single quote is literal,
+            # so a quick substring test spares shlex.quote's unsafe-char scan
+            return "'" + text + "'"
         # shlex.quote will handle all necessary escaping, including newlines,
         # to pass the entire script as a single argument to a shell like `bash -c`.
         return shlex.quote(text)
@@ -702,29 +789,20 @@ class TextEditorDialog(Gtk.Dialog):
         self._is_modifying_programmatically = True
         self.buffer.begin_user_action()
 
-        # Collect all cursor positions (primary and secondary)
-        all_selections = []
-        # Add secondary cursors
+        # Collect all cursor positions (primary and secondary) as offsets; the
+        # set drops a primary selection that coincides with a secondary cursor
+        selections = set()
         for cursor in self.cursors:
-            all_selections.append(self.order_iters((cursor.tag.get_start_iter(), cursor.tag.get_end_iter())))
-        # Add primary cursor
-        all_selections.append(self.order_iters(self.get_selection_iters()))
-
-        # Remove duplicates (in case primary selection overlaps with a secondary cursor)
-        unique_selections = []
-        seen_offsets = set()
-        for start, end in all_selections:
-            if start and end:
-                offsets = (start.get_offset(), end.get_offset())
-                if offsets not in seen_offsets:
-                    unique_selections.append((start, end))
-                    seen_offsets.add(offsets)
-
-        # Sort all selections in reverse order by start position
-        sorted_selections = sorted(unique_selections, key=lambda s: s[0].get_offset(), reverse=True)
-
-        # Perform insertions
-        for start, end in sorted_selections:
+            start_offset = cursor.tag.get_start_iter().get_offset()
+            end_offset = cursor.tag.get_end_iter().get_offset()
+            selections.add((min(start_offset, end_offset), max(start_offset, end_offset)))
+        (start, end) = self.get_selection_iters()
+        selections.add((start.get_offset(), end.get_offset()))
+
+        # Edit from the end of the buffer backwards so earlier offsets stay valid
+        for (start_offset, end_offset) in sorted(selections, reverse=True):
+            start = self.buffer.get_iter_at_offset(start_offset)
+            end = self.buffer.get_iter_at_offset(end_offset)
             self.buffer.delete(start, end)
             self.buffer.insert(start, text)
 
@@ -735,6 +813,9 @@ class TextEditorDialog(Gtk.Dialog):
         """Formats the entire buffer content using an external tool (shfmt)."""
         try:
             original_content = self.get_raw_content()
+            if original_content == self._last_formatted:
+                # Already shfmt output, running it again would change nothing
+                return
             # Use shfmt to format the code. The '-i 2' flag sets indentation to 2 spaces.
             # The '-s' flag simplifies the code where possible.
             process = subprocess.run(
@@ -745,6 +826,9 @@ class TextEditorDialog(Gtk.Dialog):
                 check=True
             )
             formatted_content = process.stdout
+            self._last_formatted = formatted_content
+            if formatted_content == original_content:
+                return
             
             # Replace the entire buffer content in a single undoable action
             self.buffer.begin_user_action()
@@ -805,23 +889,68 @@ class TextEditorDialog(Gtk.Dialog):
         self.info_bar.set_message_type(msg_type)
         self.info_bar.show()
 
-    def compile_keymap(self):
-        new_keymap = {}
-        for (combo, action) in self.keymap.items():
-            keyval, mods = Gtk.accelerator_parse(combo)
-            new_keymap[(keyval, mods)] = action
-        self.keymap = new_keymap
+    @classmethod
+    def _install_css(cls):
+        # The provider is screen-wide, so it is parsed and added once per process
+        if cls.css_provider is not None:
+            return
+        cls.css_provider = Gtk.CssProvider()
+        cls.css_provider.load_from_data(b"""
+            .suggested-action { background-color: #4CAF50; color: white; }
+            .ai-chat-window {
+                background-color: rgba(45, 45, 45, 0.95);
+                color: white;
+            }
+            .ai-chat-header {
+                background-color: rgba(255, 255, 255, 0.05);
+                padding: 8px;
+                font-weight: bold;
+                border-bottom: 1px solid rgba(255, 255, 255, 0.1);
+            }
+            .chat-close-button {
+                background: none;
+                border: none;
+                padding: 0;
+            }
+            .user-message {
+                color: #e0e0e0;
+                font-size: small;
+            }
+            .bot-message {
+                color: #a5d6a7; /* A light green for the bot */
+                font-size: small;
+            }
+            """)
+        Gtk.StyleContext.add_provider_for_screen(
+            Gdk.Screen.get_default(), cls.css_provider, Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
+        )
+
+    @classmethod
+    def _compiled_keymap(cls):
+        if cls._keymap_cache is None:
+            keymap = {}
+            for (combo, name) in cls.keymap_spec:
+                keyval, mods = Gtk.accelerator_parse(combo)
+                keymap[(keyval, mods)] = name
+            cls._keymap_cache = keymap
+        return cls._keymap_cache
     
     def _hook_view_handlers(self):
-        self.add_handler(self.view, 'event', self.on_event)
+        # Only key and button presses are handled, so don't have every motion
+        # and crossing event of the view dispatched into Python
+        self.add_handler(self.view, 'key-press-event', self.on_key_press)
+        self.add_handler(self.view, 'button-press-event', self.on_button_press)
         self.add_handler(self.view, 'move-cursor', self.mc_move_cursor)
         self.add_handler(self.view, 'copy-clipboard', self.mc_save_clipboard)
         self.add_handler(self.view, 'cut-clipboard', self.mc_save_clipboard)
         self.add_handler(self.view, 'paste-clipboard', self.mc_paste_clipboard)
 
     def _hook_document_handlers(self):
-        self.add_handler(self.doc, 'delete-range', self.delete)
-        self.add_handler(self.doc, 'insert-text', self.insert)
+        # Kept so end_user_action can block them while replaying edits
+        self._edit_handler_ids = (
+            self.add_handler(self.doc, 'delete-range', self.delete),
+            self.add_handler(self.doc, 'insert-text', self.insert),
+        )
         self.add_handler(self.doc, 'begin-user-action', self.begin_user_action)
         self.add_handler(self.doc, 'end-user-action', self.end_user_action)
         
@@ -830,100 +959,165 @@ class TextEditorDialog(Gtk.Dialog):
 
     def add_handler(self, obj, signal, handler, when=None):
         if (when == 'after'):
-            self._handlers.append((obj, obj.connect_after(signal, handler)))
+            handler_id = obj.connect_after(signal, handler)
         else:
-            self._handlers.append((obj, obj.connect(signal, handler)))
+            handler_id = obj.connect(signal, handler)
+        self._handlers.setdefault(obj, []).append(handler_id)
+        return handler_id
 
     def remove_handlers(self, remove_obj=None):
-        kept = []
-        for (obj, handler_id) in self._handlers:
-            if ((remove_obj is None) or (remove_obj == obj)):
+        # Handler ids are grouped by object, so unhooking the document
+        # doesn't walk the view's handlers
+        if remove_obj is None:
+            objs = list(self._handlers)
+        elif remove_obj in self._handlers:
+            objs = [remove_obj]
+        else:
+            return
+        for obj in objs:
+            for handler_id in self._handlers.pop(obj):
                 if obj.handler_is_connected(handler_id):
                     obj.disconnect(handler_id)
-            else:
-                kept.append((obj, handler_id))
-        self._handlers = kept
-
-    def on_event(self, view, event):
-        if event.type == Gdk.EventType.KEY_PRESS:
-            return self.on_key_press(view, event)
-        elif event.type == Gdk.EventType.BUTTON_PRESS:
-            if (event.get_state()[1] & Gdk.ModifierType.CONTROL_MASK):
-                (x, y) = self.view.window_to_buffer_coords(Gtk.TextWindowType.TEXT, int(event.x), int(event.y))
-                found, pos = self.view.get_iter_at_location(x, y)
-                if found:
-                    self.add_cursor(pos, pos)
-                return True
-            else:
-                self.clear_cursors()
-        return False
 
-    def on_key_press(self, view, event):
-        keyval = event.keyval
-        mods = event.state & Gtk.accelerator_get_default_mod_mask()
-        if (keyval, mods) in self.keymap:
-            self.keymap[(keyval, mods)]()
+    def on_button_press(self, view, event):
+        # button-press-event also carries double and triple clicks
+        if event.type != Gdk.EventType.BUTTON_PRESS:
+            return False
+        if (event.get_state()[1] & Gdk.ModifierType.CONTROL_MASK):
+            (x, y) = self.view.window_to_buffer_coords(Gtk.TextWindowType.TEXT, int(event.x), int(event.y))
+            found, pos = self.view.get_iter_at_location(x, y)
+            if found:
+                self.add_cursor(pos, pos)
             return True
+        self.clear_cursors()
         return False
 
-    def order_iters(self, iters):
-        if iters is None or iters[0] is None or iters[1] is None:
-            return (None, None)
-        return (iters[1], iters[0]) if iters[0].get_offset() > iters[1].get_offset() else iters
+    def on_key_press(self, view, event):
+        keyval = event.keyval
+        if keyval not in self._keymap_keyvals:
+            return False
+        action = self.keymap.get((keyval, event.state & self._default_mod_mask))
+        if action is None:
+            return False
+        action()
+        return True
 
     def get_selection_iters(self):
-        insert_iter = self.doc.get_iter_at_mark(self.doc.get_mark("insert"))
-        selection_bound_iter = self.doc.get_iter_at_mark(self.doc.get_mark("selection_bound"))
-        return (insert_iter, selection_bound_iter)
+        # Always returns (start, end) in buffer order, so callers need no
+        # sorting or None checks. One call returns both bounds of a selection.
+        bounds = self.doc.get_selection_bounds()
+        if bounds:
+            return bounds
+        insert_iter = self.doc.get_iter_at_mark(self._insert_mark)
+        return (insert_iter, insert_iter.copy())
     
     def match_cursor_fuzzy(self): self.match_cursor(fuzzy=True)
     def match_cursor(self, fuzzy=False):
-        (sel_start, sel_end) = self.order_iters(self.get_selection_iters())
-        if not sel_start: return
+        (sel_start, sel_end) = self.get_selection_iters()
         text = self.doc.get_text(sel_start, sel_end, True)
         if not text: return
+        alternatives = self.get_fuzzy_alternatives(text) if fuzzy else None
         
         if self.cursors:
             search_start = self.cursors[-1].tag.get_end_iter()
         else:
-            self.tag_all_matches(text, fuzzy)
+            self.tag_all_matches(text, fuzzy, alternatives)
             search_start = sel_end
         
         search_end = sel_start if search_start.get_offset() < sel_start.get_offset() else None
-        match = self.get_next_match(text, search_start, search_end, fuzzy)
+        match = self.get_next_match(text, search_start, search_end, fuzzy, alternatives)
         
         if (match is None and search_start.get_offset() >= sel_end.get_offset()):
-            match = self.get_next_match(text, self.doc.get_start_iter(), sel_start, fuzzy)
+            match = self.get_next_match(text, self.doc.get_start_iter(), sel_start, fuzzy, alternatives)
         
         if match:
             self.add_cursor(match[0], match[1])
             self.cursors[-1].scroll_onscreen()
 
-    def tag_all_matches(self, text, fuzzy):
-        (sel_start, sel_end) = self.order_iters(self.get_selection_iters())
-        if not sel_start: return
+    def tag_all_matches(self, text, fuzzy, alternatives=None):
+        (sel_start, sel_end) = self.get_selection_iters()
+        if fuzzy and alternatives is None:
+            alternatives = self.get_fuzzy_alternatives(text)
+        match_tag = self.get_match_tag()
+        search_text = self.get_search_text() if fuzzy else None
+        if search_text is not None:
+            # A single scan of the snapshot yields every match, iters are only
+            # created for the ranges that get tagged
+            sel_offset = sel_start.get_offset()
+            for m in _alternatives_pattern(alternatives).finditer(search_text):
+                if m.start() == sel_offset: continue
+                self.doc.apply_tag(match_tag, self.doc.get_iter_at_offset(m.start()), self.doc.get_iter_at_offset(m.end()))
+                self.matches.append(m.span())
+            return
         start_iter = self.doc.get_start_iter()
         while True:
-            match = self.get_next_match(text, start_iter, None, fuzzy)
+            match = self.get_next_match(text, start_iter, None, fuzzy, alternatives)
             if not match: break
             start_iter = match[1]
             if match[0].get_offset() == sel_start.get_offset(): continue
-            self.matches.append(MarkTag(self.view, 'multicursor_match', match[0], match[1]))
+            # Matches only live until the next edit or move, so tag the text
+            # directly instead of anchoring a MarkTag to each one
+            self.doc.apply_tag(match_tag, match[0], match[1])
+            self.matches.append((match[0].get_offset(), match[1].get_offset()))
+
+    def get_match_tag(self):
+        return MarkTag.get_doc_tag(self.doc, 'multicursor_match')
     
     def clear_matches(self):
-        for match in self.matches: match.remove()
+        if self.matches:
+            self.doc.remove_tag(self.get_match_tag(), self.doc.get_start_iter(), self.doc.get_end_iter())
         self.matches = []
 
-    def get_next_match(self, text, search_start, search_end, fuzzy):
-        if fuzzy:
-            flags = Gtk.TextSearchFlags.CASE_INSENSITIVE
+    def get_fuzzy_alternatives(self, text):
+        # Repeated fuzzy matches usually run on the same selection text
+        if self._casing_cache[0] == text:
+            return self._casing_cache[1]
+        if text.isalnum() and text.lower() == text:
+            # A single lowercase word has no other spelling to look for
+            alternatives = (text,)
+        else:
             casing = Casing().detect(text)
             words = casing.split(text)
-            alternatives = {text, Casing('lower', '_').join(words), Casing('lower', '-').join(words), Casing('lower', '').join(words)}
+            spellings = (text, Casing('lower', '_').join(words), Casing('lower', '-').join(words), Casing('lower', '').join(words))
+            # Matching ignores case, so spellings equal up to case are one alternative;
+            # dict.fromkeys keeps the selection text first for ties
+            alternatives = tuple(dict.fromkeys(alt.lower() for alt in spellings if alt))
+        self._casing_cache = (text, alternatives)
+        return alternatives
+
+    def get_search_text(self):
+        """
+        Returns the lowercased buffer content for case-insensitive searching
+        with str.find, or None if lowercasing would shift character offsets.
+        """
+        if self._search_text_stale:
+            # get_slice keeps a placeholder for embedded objects, so string
+            # offsets line up with buffer offsets
+            text = self.doc.get_slice(self.doc.get_start_iter(), self.doc.get_end_iter(), True)
+            search_text = text.lower()
+            self._search_text = search_text if len(search_text) == len(text) else None
+            self._search_text_stale = False
+        return self._search_text
+
+    def _on_buffer_changed(self, buffer):
+        self._search_text_stale = True
+
+    def get_next_match(self, text, search_start, search_end, fuzzy, alternatives=None):
+        if fuzzy:
+            flags = Gtk.TextSearchFlags.CASE_INSENSITIVE
+            if alternatives is None:
+                alternatives = self.get_fuzzy_alternatives(text)
+            search_text = self.get_search_text()
+            if search_text is not None:
+                start = search_start.get_offset()
+                end = search_end.get_offset() if search_end is not None else len(search_text)
+                m = _alternatives_pattern(alternatives).search(search_text, start, end)
+                if m is None:
+                    return None
+                return (self.doc.get_iter_at_offset(m.start()), self.doc.get_iter_at_offset(m.end()))
             
             earliest = None
             for alt in alternatives:
-                if not alt: continue
                 match = search_start.forward_search(alt, flags, search_end)
                 if match and (earliest is None or match[0].get_offset() < earliest[0].get_offset()):
                     earliest = match
@@ -936,19 +1130,17 @@ class TextEditorDialog(Gtk.Dialog):
         if self.cursors:
             self.cursors[-1].scroll_onscreen()
         else:
-            self.view.scroll_to_mark(self.doc.get_insert(), 0.0, True, 0.5, 0.5)
+            self.view.scroll_to_mark(self._insert_mark, 0.0, True, 0.5, 0.5)
     
     def column_select_up(self): self.column_select(-1)
     def column_select_down(self): self.column_select(1)
     def column_select(self, line_delta):
-        (sel_start, sel_end) = self.order_iters(self.get_selection_iters())
-        if not sel_start: return
+        (sel_start, sel_end) = self.get_selection_iters()
         
         sel_line = sel_start.get_line()
-        min_line = max_line = sel_line
-        for cursor in self.cursors:
-            line = cursor.tag.get_start_iter().get_line()
-            min_line, max_line = min(line, min_line), max(line, max_line)
+        lines = [cursor.tag.get_start_iter().get_line() for cursor in self.cursors]
+        lines.append(sel_line)
+        min_line, max_line = min(lines), max(lines)
         
         start_line = None
         if line_delta < 0 and max_line == sel_line: start_line = min_line
@@ -964,7 +1156,7 @@ class TextEditorDialog(Gtk.Dialog):
         start_iter.set_line_offset(min(sel_start.get_line_offset(), start_iter.get_chars_in_line()))
         
         end_iter = sel_end.copy()
-        end_iter.set_line(line + (sel_end.get_line() - sel_start.get_line()))
+        end_iter.set_line(line + (sel_end.get_line() - sel_line))
         end_iter.set_line_offset(min(sel_end.get_line_offset(), end_iter.get_chars_in_line()))
         
         if start_iter.get_line() != start_line:
@@ -973,11 +1165,17 @@ class TextEditorDialog(Gtk.Dialog):
     
     def add_cursor(self, start_iter, end_iter):
         if not self.cursors: self._hook_document_handlers()
-        self.cursors.append(Cursor(self.view, start_iter, end_iter))
+        cursor = Cursor(self.view, start_iter, end_iter)
+        self.cursors.append(cursor)
+        # Edits apply the same delta to every cursor, so their relative order
+        # only needs to be established once, when the cursor is added
+        offsets = [c.tag.get_start_iter().get_offset() for c in self._cursors_by_offset]
+        self._cursors_by_offset.insert(bisect.bisect(offsets, start_iter.get_offset()), cursor)
 
     def remove_cursor(self, index):
         if self.cursors:
             self.cursors[index].remove()
+            self._cursors_by_offset.remove(self.cursors[index])
             del self.cursors[index]
             if not self.cursors: self._unhook_document_handlers()
 
@@ -988,17 +1186,14 @@ class TextEditorDialog(Gtk.Dialog):
     
     def insert(self, doc, start, text, length):
         if self._in_user_action and not self._is_modifying_programmatically:
-            (sel_start, sel_end) = self.order_iters(self.get_selection_iters())
-            if not sel_start: return
+            (sel_start, sel_end) = self.get_selection_iters()
             start_delta = start.get_offset() - sel_start.get_offset()
             self.store_user_action(self.mc_insert, (start_delta, text))
 
     def delete(self, doc, start, end):
         if self._in_user_action and not self._is_modifying_programmatically:
-            (start, end) = self.order_iters((start, end))
-            if not start: return
-            (sel_start, sel_end) = self.order_iters(self.get_selection_iters())
-            if not sel_start: return
+            # GtkTextBuffer orders the range before emitting delete-range
+            (sel_start, sel_end) = self.get_selection_iters()
             start_delta = start.get_offset() - sel_start.get_offset()
             end_delta = end.get_offset() - sel_end.get_offset()
             self.store_user_action(self.mc_delete, (start_delta, end_delta))
@@ -1023,26 +1218,40 @@ class TextEditorDialog(Gtk.Dialog):
 
             self.clear_matches()
             
+            # The replayed edits land in the undo group that is still open (the
+            # UndoManager closes it after this handler). Our own insert/delete
+            # handlers would ignore them anyway, so don't dispatch to them.
             self._is_modifying_programmatically = True
-            
-            for action, args in actions_to_run:
-                action(*args)
-            
-            self._is_modifying_programmatically = False
+            blocked = self._edit_handler_ids
+            for handler_id in blocked:
+                self.doc.handler_block(handler_id)
+            try:
+                for action, args in actions_to_run:
+                    action(*args)
+            finally:
+                for handler_id in blocked:
+                    if self.doc.handler_is_connected(handler_id):
+                        self.doc.handler_unblock(handler_id)
+                self._is_modifying_programmatically = False
         
     def mc_insert(self, start_delta, text):
-        sorted_cursors = sorted(self.cursors, key=lambda c: c.tag.get_start_iter().get_offset(), reverse=True)
-        if self._handled_paste and text == self.clipboard:
-            for cursor in sorted_cursors:
-                cursor.insert(start_delta, cursor.clipboard or text)
-        else:
-            for cursor in sorted_cursors:
-                cursor.insert(start_delta, text)
+        sorted_cursors = list(reversed(self._cursors_by_offset))
+        use_clipboard = self._handled_paste and text == self.clipboard
+        # Resolve every insertion point before touching the buffer; going from
+        # the highest offset down keeps the earlier ones valid
+        edits = [(cursor.tag.get_start_iter().get_offset() + start_delta,
+                  (cursor.clipboard or text) if use_clipboard else text)
+                 for cursor in sorted_cursors]
+        for cursor in sorted_cursors:
+            cursor.tag.set_capturing_gravity(False)
+        for (offset, cursor_text) in edits:
+            self.doc.insert(self.doc.get_iter_at_offset(offset), cursor_text)
+        for cursor in sorted_cursors:
+            cursor.tag.set_capturing_gravity(True)
         self._handled_paste = False
 
     def mc_delete(self, start_delta, end_delta):
-        sorted_cursors = sorted(self.cursors, key=lambda c: c.tag.get_start_iter().get_offset(), reverse=True)
-        for cursor in sorted_cursors:
+        for cursor in reversed(self._cursors_by_offset):
             cursor.delete(start_delta, end_delta)
 
     def mc_move_cursor(self, view, step_size, count, extend_selection):
@@ -1050,12 +1259,26 @@ class TextEditorDialog(Gtk.Dialog):
         if step_size in (Gtk.MovementStep.BUFFER_ENDS, Gtk.MovementStep.PAGES):
             self.clear_cursors()
             return
+        if len(self.cursors) > 1:
+            for cursor in self.cursors:
+                cursor.move(step_size, count, extend_selection, retag=False)
+            self._refresh_multicursor_tags()
+        else:
+            for cursor in self.cursors:
+                cursor.move(step_size, count, extend_selection)
+
+    def _refresh_multicursor_tags(self):
+        """Re-tags every cursor range with one removal over the whole buffer."""
+        tag = self.cursors[0].tag.get_tag()
+        self.doc.remove_tag(tag, self.doc.get_start_iter(), self.doc.get_end_iter())
         for cursor in self.cursors:
-            cursor.move(step_size, count, extend_selection)
+            start_iter = cursor.tag.get_start_iter()
+            end_iter = cursor.tag.get_end_iter()
+            if not start_iter.equal(end_iter):
+                self.doc.apply_tag(tag, start_iter, end_iter)
             
     def mc_save_clipboard(self, view):
-        (sel_start, sel_end) = self.order_iters(self.get_selection_iters())
-        if not sel_start: return
+        (sel_start, sel_end) = self.get_selection_iters()
         self.clipboard = self.doc.get_text(sel_start, sel_end, True)
         for cursor in self.cursors: cursor.save_text()
             
@@ -5,18 +5,30 @@ A searchable emoji selector dialog.
 import gi
 import json
 import logging
+import os
 from pathlib import Path
-import re
-from collections import OrderedDict
+import pickle
+import threading
+import time
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk, Gdk, GLib
+from gi.repository import Gtk, Gdk, Gio, GLib
 
 log = logging.getLogger(__name__)
 
 # --- Constants ---
 DEBOUNCE_DELAY = 150  # milliseconds
 MAX_RECENT_EMOJIS = 20
+MIN_QUERY_LENGTH = 2  # a single letter is in nearly every emoji name
+QUERY_CACHE_SIZE = 32
+# Applied to both the indexed text and queries (after lower()), so that
+# "face-with" and "face with" find the same emojis
+SEARCH_NORMALIZATION = str.maketrans("-", " ")
+INDEX_CACHE_FILE = "emoji_index.pkl"  # in the user cache directory
+INDEX_CACHE_VERSION = 2  # bump when the cached index layout changes
+EMOJIS_PER_LINE = 10
+PLACEHOLDER_LINE_HEIGHT = 40  # pixels, roughly one line of emoji buttons
+POPULATE_TIME_SLICE = 0.008  # seconds of row building per idle callback
 
 class SearchableEmojiSelector(Gtk.Dialog):
     """
@@ -31,6 +43,11 @@ class SearchableEmojiSelector(Gtk.Dialog):
     """
     _emoji_cache = None
     _search_index = None
+    _ngram_index = None
+    _category_positions = None
+    _load_waiters = None
+    _recent_cache = None  # (history path, mtime_ns, recents) of the last read or write
+    css_provider = None
 
     def __init__(self, parent, emoji_file_path, history_file_path):
         """
@@ -48,17 +65,37 @@ class SearchableEmojiSelector(Gtk.Dialog):
         # --- Instance variables ---
         self.history_file_path = Path(history_file_path)
         self.selected_emoji = None
-        self._load_emojis(emoji_file_path) # Ensures cache and index are built
         self.recent_emojis = self._load_recent_emojis()
         self.populate_generator_id = None
+        self._loading_row = None
+        self._rows_built = False
+        self._matches = None
+        self._query_cache = {}
+        self._emoji_children = {}
+        self._recent_rows = ()
+        self._category_rows = []
+        self._unbuilt_sections = []
+        self._fill_idle_id = None
+        self._no_results_row = None
         self.debounce_timer_id = None
+        self._last_filter = ""
         self._map_handler_id = None
 
         # --- Event connections ---
         self.connect("key-press-event", self._on_key_press)
+        self.connect("destroy", self._on_destroy)
+
+        # Every emoji button activates this one action with its emoji as target,
+        # instead of holding a "clicked" closure of its own
+        self._emoji_infos = {}
+        select_action = Gio.SimpleAction.new("select", GLib.VariantType.new("s"))
+        select_action.connect("activate", self._on_emoji_activated)
+        action_group = Gio.SimpleActionGroup()
+        action_group.add_action(select_action)
+        self.insert_action_group("emoji", action_group)
 
         # --- UI Setup ---
-        self._setup_css()
+        self._install_css()
         
         vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6, margin=10)
         self.get_content_area().add(vbox)
@@ -70,14 +107,18 @@ class SearchableEmojiSelector(Gtk.Dialog):
         vbox.pack_start(self.search_entry, False, False, 0)
 
         # Scrolled Window and ListBox
-        scrolled_window = Gtk.ScrolledWindow()
-        scrolled_window.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
-        scrolled_window.set_vexpand(True)
-        vbox.pack_start(scrolled_window, True, True, 0)
+        self.scrolled_window = Gtk.ScrolledWindow()
+        self.scrolled_window.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        self.scrolled_window.set_vexpand(True)
+        vbox.pack_start(self.scrolled_window, True, True, 0)
 
         self.listbox = Gtk.ListBox()
         self.listbox.set_selection_mode(Gtk.SelectionMode.NONE)
-        scrolled_window.add(self.listbox)
+        self.scrolled_window.add(self.listbox)
+
+        # Category grids are built when they scroll near the viewport
+        self.scrolled_window.get_vadjustment().connect("value-changed", self._queue_fill_visible_sections)
+        self.listbox.connect("size-allocate", self._queue_fill_visible_sections)
         
         # Defer the expensive list population until the dialog is shown
         self._map_handler_id = self.connect("map-event", self._on_first_map)
@@ -85,6 +126,8 @@ class SearchableEmojiSelector(Gtk.Dialog):
         self.show_all()
         self.search_entry.grab_focus()
 
+        self._load_emojis(emoji_file_path) # Builds cache and index in the background
+
     def _on_first_map(self, widget, event):
         """Called only once when the dialog is first shown to do the initial population."""
         if self._map_handler_id:
@@ -93,10 +136,13 @@ class SearchableEmojiSelector(Gtk.Dialog):
         self._populate_list()
         return False
 
-    def _setup_css(self):
-        """Loads custom CSS for the dialog's widgets."""
-        css_provider = Gtk.CssProvider()
-        css_provider.load_from_data(b"""
+    @classmethod
+    def _install_css(cls):
+        """Loads custom CSS for the dialog's widgets, once per process."""
+        if cls.css_provider is not None:
+            return
+        cls.css_provider = Gtk.CssProvider()
+        cls.css_provider.load_from_data(b"""
             .emoji-button {
                 border: 1px solid transparent;
                 border-radius: 4px;
@@ -124,7 +170,7 @@ class SearchableEmojiSelector(Gtk.Dialog):
             }
         """)
         Gtk.StyleContext.add_provider_for_screen(
-            Gdk.Screen.get_default(), css_provider, Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
+            Gdk.Screen.get_default(), cls.css_provider, Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
         )
 
     # --- Event Handlers ---
@@ -155,11 +201,19 @@ class SearchableEmojiSelector(Gtk.Dialog):
         """Triggers the repopulation of the list based on the search query."""
         self.debounce_timer_id = None
         filter_text = self.search_entry.get_text().strip()
+        if len(filter_text) < MIN_QUERY_LENGTH and filter_text.isalpha():
+            # Too short to narrow anything down, keep showing everything
+            filter_text = ""
+        if filter_text == self._last_filter:
+            # e.g. only surrounding whitespace changed, the list is already right
+            return False
+        self._last_filter = filter_text
         self._populate_list(filter_text)
         return False
 
-    def _on_emoji_clicked(self, button, emoji_info):
+    def _on_emoji_activated(self, action, parameter):
         """Callback for when an emoji button is clicked."""
+        emoji_info = self._emoji_infos[parameter.get_string()]
         self.selected_emoji = emoji_info["emoji"]
         self._add_to_recents(emoji_info)
         self.response(Gtk.ResponseType.OK)
@@ -233,58 +287,208 @@ class SearchableEmojiSelector(Gtk.Dialog):
     # --- Data Loading and Persistence ---
 
     def _load_emojis(self, emoji_file_path):
-        """Loads emoji data and builds a search index, using a class-level cache."""
-        if SearchableEmojiSelector._emoji_cache is not None:
+        """
+        Makes sure the class-level emoji cache and search index get built. The
+        first dialog parses the file on a worker thread, so it can show up
+        before the data is ready.
+        """
+        cls = SearchableEmojiSelector
+        if cls._emoji_cache is not None:
             return
-
+        self.connect("destroy", self._on_destroy_while_loading)
+        if cls._load_waiters is not None:
+            cls._load_waiters.append(self)
+            return
+        cls._load_waiters = [self]
         log.info("Loading emojis from file for the first time: %s", emoji_file_path)
+        threading.Thread(
+            target=cls._background_load, args=(emoji_file_path,), daemon=True
+        ).start()
+
+    @staticmethod
+    def _background_load(emoji_file_path):
+        """Worker thread body: reads the emoji file and hands it to the main loop."""
+        result = SearchableEmojiSelector._read_emoji_file(emoji_file_path)
+        GLib.idle_add(SearchableEmojiSelector._on_emojis_loaded, result)
+
+    @staticmethod
+    def _read_emoji_file(emoji_file_path):
+        """
+        Parses the emoji file and builds its search indexes. Doesn't touch GTK
+        or the class, so it is safe to run off the main thread.
+
+        :return: an (emojis, search_index, ngram_index, category_positions) tuple,
+            or None on error.
+        """
         path = Path(emoji_file_path)
-        if not path.exists():
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
             log.error("Emoji file not found at: %s", emoji_file_path)
-            return
+            return None
+        # The cached index is only valid for this exact version of this file,
+        # and for the layout of the tuple this version of the code builds
+        stamp = (INDEX_CACHE_VERSION, str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+        cached = SearchableEmojiSelector._read_index_cache(stamp)
+        if cached is not None:
+            return cached
+
         try:
             with path.open("r", encoding="utf-8") as f:
                 data = json.load(f)
-            
-            SearchableEmojiSelector._emoji_cache = data.get("emojis", {})
-            
-            # Build the search index once
-            index = []
-            for category, subcategories in SearchableEmojiSelector._emoji_cache.items():
-                for subcategory, emojis in subcategories.items():
-                    for emoji_info in emojis:
-                        searchable_text = (
-                            f"{category} {subcategory} {emoji_info['name']}"
-                        ).lower().replace('-', ' ')
-                        index.append({
-                            "search_text": searchable_text,
-                            "category": category,
-                            "emoji_info": emoji_info
-                        })
-            SearchableEmojiSelector._search_index = index
-
         except (json.JSONDecodeError, IOError) as e:
             log.error("Failed to load or parse emoji file %s: %s", emoji_file_path, e)
+            return None
+        emojis = data.get("emojis", {})
+
+        # Build the search index once, as flat (search_text, category, emoji_info)
+        # tuples so filtering does not pay for a dict lookup per field.
+        # Positions are also bucketed by category, in order, for building the list.
+        index = []
+        category_positions = {}
+        for category, subcategories in emojis.items():
+            positions = category_positions.setdefault(category, [])
+            for subcategory, category_emojis in subcategories.items():
+                for emoji_info in category_emojis:
+                    searchable_text = (
+                        f"{category} {subcategory} {emoji_info['name']}"
+                    ).lower().translate(SEARCH_NORMALIZATION)
+                    positions.append(len(index))
+                    index.append((searchable_text, category, emoji_info))
+
+        # Map every substring of one to three characters to the index positions
+        # containing it: short query tokens are looked up as they are, longer
+        # ones are narrowed by their trigrams
+        ngrams = {}
+        for position, (searchable_text, _, _) in enumerate(index):
+            length = len(searchable_text)
+            for i in range(length):
+                for j in range(i + 1, min(i + 3, length) + 1):
+                    ngrams.setdefault(searchable_text[i:j], set()).add(position)
+
+        result = (emojis, index, ngrams, category_positions)
+        SearchableEmojiSelector._write_index_cache(stamp, result)
+        return result
+
+    @staticmethod
+    def _index_cache_path():
+        return Path(GLib.get_user_cache_dir()) / "guake" / INDEX_CACHE_FILE
+
+    @staticmethod
+    def _read_index_cache(stamp):
+        """
+        Returns the pickled _read_emoji_file result built from the
+        emoji file identified by stamp, or None if the cache is missing, stale
+        or unreadable. The JSON file stays the source of truth.
+        """
+        cache_path = SearchableEmojiSelector._index_cache_path()
+        try:
+            with cache_path.open("rb") as f:
+                (cached_stamp, result) = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError) as e:
+            log.warning("Ignoring unreadable emoji cache %s: %s", cache_path, e)
+            return None
+        return result if cached_stamp == stamp else None
+
+    @staticmethod
+    def _write_index_cache(stamp, result):
+        """Pickles the parsed emojis and their indexes; unpickling is much faster than rebuilding."""
+        cache_path = SearchableEmojiSelector._index_cache_path()
+        tmp_path = cache_path.with_suffix(".tmp")
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with tmp_path.open("wb") as f:
+                pickle.dump((stamp, result), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            log.debug("Could not write emoji cache %s: %s", cache_path, e)
+
+    @staticmethod
+    def _on_emojis_loaded(result):
+        """Main loop side of the background load: fills the cache and wakes up open dialogs."""
+        cls = SearchableEmojiSelector
+        if result is not None:
+            (cls._emoji_cache, cls._search_index, cls._ngram_index, cls._category_positions) = result
+        # On failure the cache stays empty, so the next dialog tries again
+        waiters, cls._load_waiters = cls._load_waiters, None
+        for dialog in waiters:
+            dialog._on_emojis_ready()
+        return False
+
+    def _on_destroy(self, widget):
+        """Drops the pending main loop callbacks, they would touch destroyed rows."""
+        for source_id in (self.debounce_timer_id, self.populate_generator_id, self._fill_idle_id):
+            if source_id:
+                GLib.source_remove(source_id)
+        self.debounce_timer_id = None
+        self.populate_generator_id = None
+        self._fill_idle_id = None
+
+    def _on_destroy_while_loading(self, widget):
+        waiters = SearchableEmojiSelector._load_waiters
+        if waiters is not None and self in waiters:
+            waiters.remove(self)
+
+    def _on_emojis_ready(self):
+        """Replaces the loading placeholder with the emoji list once data is in."""
+        if self._loading_row is not None:
+            self.listbox.remove(self._loading_row)
+            self._loading_row = None
+        if self._map_handler_id is None:
+            # Already mapped: populate with whatever was typed in the meantime
+            self._populate_list(self._last_filter)
 
     def _load_recent_emojis(self):
-        """Loads the list of recently used emojis from its JSON file."""
-        if not self.history_file_path.exists():
+        """
+        Loads the list of recently used emojis from its JSON file. The file is
+        only parsed again when it changed since it was last read or written.
+        """
+        try:
+            mtime = self.history_file_path.stat().st_mtime_ns
+        except OSError:
             return []
+        cached = SearchableEmojiSelector._recent_cache
+        if cached is not None and cached[:2] == (self.history_file_path, mtime):
+            return list(cached[2])
         try:
             with self.history_file_path.open("r", encoding="utf-8") as f:
-                return json.load(f)
+                recents = json.load(f)
         except (json.JSONDecodeError, IOError) as e:
             log.warning("Could not load emoji history: %s, creating new.", e)
             return []
+        SearchableEmojiSelector._recent_cache = (self.history_file_path, mtime, recents)
+        return list(recents)
 
     def _save_recent_emojis(self):
-        """Saves the list of recently used emojis to its JSON file."""
+        """
+        Saves the list of recently used emojis to its JSON file. GIO writes it in
+        the background, to a temporary file that then replaces the old one.
+        """
         try:
             self.history_file_path.parent.mkdir(parents=True, exist_ok=True)
-            with self.history_file_path.open("w", encoding="utf-8") as f:
-                json.dump(self.recent_emojis, f)
-        except IOError as e:
+        except OSError as e:
+            log.error("Could not save emoji history: %s", e)
+            return
+        contents = GLib.Bytes.new(json.dumps(self.recent_emojis).encode("utf-8"))
+        Gio.File.new_for_path(str(self.history_file_path)).replace_contents_bytes_async(
+            contents, None, False, Gio.FileCreateFlags.NONE, None,
+            SearchableEmojiSelector._on_recent_emojis_saved,
+            (self.history_file_path, list(self.recent_emojis)),
+        )
+
+    @staticmethod
+    def _on_recent_emojis_saved(gfile, result, user_data):
+        """Completes the history write; may run after the dialog is gone."""
+        (history_file_path, recents) = user_data
+        try:
+            gfile.replace_contents_finish(result)
+            mtime = history_file_path.stat().st_mtime_ns
+        except (GLib.Error, OSError) as e:
             log.error("Could not save emoji history: %s", e)
+            return
+        SearchableEmojiSelector._recent_cache = (history_file_path, mtime, recents)
 
     def _add_to_recents(self, emoji_info):
         """Adds a selected emoji to the top of the recents list and saves."""
@@ -297,98 +501,266 @@ class SearchableEmojiSelector(Gtk.Dialog):
     # --- UI Population and Filtering ---
 
     def _populate_list(self, filter_text=None):
-        """Populates the ListBox lazily based on the filter text."""
-        if self.populate_generator_id:
-            GLib.source_remove(self.populate_generator_id)
-        
-        for child in self.listbox.get_children():
-            self.listbox.remove(child)
+        """
+        Shows the emojis matching the filter text. The rows are built lazily the
+        first time; afterwards they are kept and filtering only toggles visibility.
+        """
+        if SearchableEmojiSelector._load_waiters is not None:
+            # Still loading, _on_emojis_ready populates the list later
+            if self._loading_row is None:
+                self._loading_row = Gtk.ListBoxRow(selectable=False)
+                label = Gtk.Label(label="Loading emojis...")
+                label.get_style_context().add_class("no-results-label")
+                self._loading_row.add(label)
+                self._loading_row.show_all()
+                self.listbox.add(self._loading_row)
+            return
+        previous, self._matches = self._matches, self._match_positions(filter_text)
+        if self._rows_built:
+            self._apply_filter(previous)
+            return
+        self._rows_built = True
 
-        generator = self._create_widget_generator(filter_text)
+        generator = self._create_widget_generator()
 
         def add_chunk_of_widgets():
-            CHUNK_SIZE = 10
-            for _ in range(CHUNK_SIZE):
+            # Add rows for at most a slice of a frame, then yield to the main loop
+            deadline = time.monotonic() + POPULATE_TIME_SLICE
+            while time.monotonic() < deadline:
                 try:
-                    widget = next(generator)
-                    if widget:
-                        self.listbox.add(widget)
+                    self.listbox.add(next(generator))
                 except StopIteration:
-                    if not self.listbox.get_children():
-                        label = Gtk.Label(label="No emojis found.")
-                        label.get_style_context().add_class("no-results-label")
-                        self.listbox.add(label)
-                    
-                    self.listbox.show_all()
                     self.populate_generator_id = None
                     return False
-            self.listbox.show_all()
             return True
 
         self.populate_generator_id = GLib.idle_add(add_chunk_of_widgets)
 
+    def _apply_filter(self, previous):
+        """Updates the visibility of the already built rows for the current matches."""
+        matches = self._matches
+        if previous is None or matches is None:
+            changed = self._emoji_children
+        else:
+            changed = previous ^ matches
+        for position in changed:
+            child = self._emoji_children.get(position)
+            if child is not None:
+                child.set_visible(matches is None or position in matches)
+
+        for row in self._recent_rows:
+            row.set_visible(matches is None)
+        for positions, rows in self._category_rows:
+            shown = self._section_is_shown(positions)
+            for row in rows:
+                row.set_visible(shown)
+        if self._no_results_row is not None:
+            self._no_results_row.set_visible(matches is not None and not matches)
+
+    def _section_is_shown(self, positions):
+        """Tells whether any emoji of a category matches the current filter."""
+        matches = self._matches
+        return matches is None or not matches.isdisjoint(positions)
+
+    def _create_header_row(self, title):
+        """Creates a non-selectable ListBoxRow holding a category title."""
+        header_row = Gtk.ListBoxRow(selectable=False)
+        header_row.get_style_context().add_class("category-header-row")
+        header_label = Gtk.Label(label=title, xalign=0)
+        header_label.get_style_context().add_class("category-header-label")
+        header_row.add(header_label)
+        return header_row
+
     def _create_emoji_flowbox(self, emojis):
         """Creates a FlowBox populated with emoji buttons."""
         flowbox = Gtk.FlowBox()
         flowbox.set_valign(Gtk.Align.START)
         flowbox.set_selection_mode(Gtk.SelectionMode.NONE)
-        flowbox.set_max_children_per_line(10)
+        flowbox.set_max_children_per_line(EMOJIS_PER_LINE)
+        # Tooltips are looked up on hover rather than set on every button
+        flowbox.set_has_tooltip(True)
+        flowbox.connect("query-tooltip", self._on_flowbox_query_tooltip)
         
         for emoji_info in emojis:
-            button = Gtk.Button(label=emoji_info["emoji"])
+            emoji = emoji_info["emoji"]
+            # Set everything that is a property at construction time
+            button = Gtk.Button(
+                label=emoji,
+                relief=Gtk.ReliefStyle.NONE,
+                action_name="emoji.select",
+                action_target=GLib.Variant.new_string(emoji),
+            )
             accessible = button.get_accessible()
             accessible.set_property("accessible-name", emoji_info["name"])
             
-            button.set_tooltip_text(emoji_info["name"].capitalize())
-            button.set_relief(Gtk.ReliefStyle.NONE)
             button.get_style_context().add_class("emoji-button")
-            button.connect("clicked", self._on_emoji_clicked, emoji_info)
+            self._emoji_infos.setdefault(emoji, emoji_info)
             flowbox.add(button)
         return flowbox
 
+    def _on_flowbox_query_tooltip(self, flowbox, x, y, keyboard_mode, tooltip):
+        """Shows the name of the emoji under the pointer (or focused) as tooltip."""
+        if keyboard_mode:
+            child = flowbox.get_focus_child()
+        else:
+            child = flowbox.get_child_at_pos(x, y)
+        if child is None:
+            return False
+        emoji_info = self._emoji_infos.get(child.get_child().get_label())
+        if emoji_info is None:
+            return False
+        tooltip.set_text(emoji_info["name"].capitalize())
+        return True
+
     def _tokenize_and_match(self, query_tokens, text_to_search):
         """Checks if all tokens from the query are present in the text."""
         return all(token in text_to_search for token in query_tokens)
 
-    def _create_widget_generator(self, filter_text=None):
-        """A generator that yields ListBoxRows for the emoji list."""
+    def _candidate_positions(self, query_tokens):
+        """
+        Narrows the search index down to the positions that can match the query,
+        by intersecting the n-gram postings of every token. For tokens of up to
+        three characters the postings are exactly the matching positions.
+        """
+        ngram_index = SearchableEmojiSelector._ngram_index
+        candidates = None
+        for token in query_tokens:
+            if len(token) <= 3:
+                grams = (token,)
+            else:
+                grams = (token[i:i + 3] for i in range(len(token) - 2))
+            for gram in grams:
+                postings = ngram_index.get(gram)
+                if not postings:
+                    return ()
+                candidates = postings if candidates is None else candidates & postings
+        if candidates is None:
+            return range(len(SearchableEmojiSelector._search_index))
+        return candidates
+
+    def _match_positions(self, filter_text):
+        """
+        Returns the set of search index positions matching the filter, or None
+        for all. Results of the last QUERY_CACHE_SIZE queries are kept, so
+        backspacing to an earlier query doesn't filter again.
+        """
+        # str.split drops the empty tokens a regex split leaves around whitespace
+        query_tokens = tuple(filter_text.lower().translate(SEARCH_NORMALIZATION).split()) if filter_text else ()
+        if not query_tokens or not SearchableEmojiSelector._search_index:
+            return None
+        cache = self._query_cache
+        matches = cache.pop(query_tokens, None)
+        if matches is None:
+            matches = self._filter_positions(query_tokens)
+            if len(cache) >= QUERY_CACHE_SIZE:
+                del cache[next(iter(cache))]
+        cache[query_tokens] = matches # most recently used last
+        return matches
+
+    def _filter_positions(self, query_tokens):
+        """Computes the positions matching all query tokens."""
+        index = SearchableEmojiSelector._search_index
+        candidates = self._candidate_positions(query_tokens)
+        # A query that only extends the tokens of a cached one (e.g. one more
+        # letter typed) can only match a subset of that query's results
+        for cached_tokens, cached_matches in self._query_cache.items():
+            if (len(cached_tokens) <= len(query_tokens)
+                    and all(old in new for old, new in zip(cached_tokens, query_tokens))):
+                candidates = cached_matches.intersection(candidates)
+        # The n-gram postings are exact for short tokens, only longer ones
+        # can still produce false positives that need a substring check
+        long_tokens = [token for token in query_tokens if len(token) > 3]
+        if not long_tokens:
+            return set(candidates)
+        return {
+            position for position in candidates
+            if self._tokenize_and_match(long_tokens, index[position][0])
+        }
+
+    def _queue_fill_visible_sections(self, *args):
+        """Schedules _fill_visible_sections, outside of the allocation in progress."""
+        if self._fill_idle_id is None and self._unbuilt_sections:
+            self._fill_idle_id = GLib.idle_add(self._fill_visible_sections)
+
+    def _fill_visible_sections(self):
+        """Builds the emoji grids of the category rows within a page of the viewport."""
+        self._fill_idle_id = None
+        adjustment = self.scrolled_window.get_vadjustment()
+        page = adjustment.get_page_size()
+        top = adjustment.get_value() - page
+        bottom = adjustment.get_value() + 2 * page
+        pending = []
+        for emoji_row, positions in self._unbuilt_sections:
+            allocation = emoji_row.get_allocation()
+            if (emoji_row.get_mapped() and allocation.height > 1
+                    and allocation.y + allocation.height >= top and allocation.y <= bottom):
+                self._build_section(emoji_row, positions)
+            else:
+                pending.append((emoji_row, positions))
+        self._unbuilt_sections = pending
+        return False
+
+    def _build_section(self, emoji_row, positions):
+        """Replaces a category row's placeholder with its grid of emoji buttons."""
+        index = SearchableEmojiSelector._search_index
+        emoji_row.remove(emoji_row.get_child())
+        flowbox = self._create_emoji_flowbox(index[position][2] for position in positions)
+        emoji_row.add(flowbox)
+        flowbox.show_all()
+
+        matches = self._matches
+        for position, child in zip(positions, flowbox.get_children()):
+            self._emoji_children[position] = child
+            if matches is not None and position not in matches:
+                child.hide()
+
+    def _create_widget_generator(self):
+        """
+        A generator that yields every ListBoxRow of the emoji list, already shown
+        and filtered according to the current matches. Category grids start out
+        as placeholders, see _fill_visible_sections.
+        """
         if not SearchableEmojiSelector._search_index:
-            yield Gtk.Label(label="Could not load emoji data.")
+            label = Gtk.Label(label="Could not load emoji data.")
+            label.show()
+            yield label
             return
 
         # --- Recently Used Section ---
-        if not filter_text and self.recent_emojis:
-            header_row = Gtk.ListBoxRow(selectable=False)
-            header_row.get_style_context().add_class("category-header-row")
-            header_label = Gtk.Label(label="Recently Used", xalign=0)
-            header_label.get_style_context().add_class("category-header-label")
-            header_row.add(header_label)
-            yield header_row
-            
+        if self.recent_emojis:
+            header_row = self._create_header_row("Recently Used")
             emoji_row = Gtk.ListBoxRow(selectable=False)
             emoji_row.add(self._create_emoji_flowbox(self.recent_emojis))
-            yield emoji_row
-
-        # --- Filter and Group Emojis ---
-        results_by_category = OrderedDict()
-        query_tokens = re.split(r'\s+', filter_text.lower()) if filter_text else []
-        
-        for item in SearchableEmojiSelector._search_index:
-            if not query_tokens or self._tokenize_and_match(query_tokens, item["search_text"]):
-                category = item["category"]
-                if category not in results_by_category:
-                    results_by_category[category] = []
-                results_by_category[category].append(item["emoji_info"])
-
-        # --- Yield Widgets from Grouped Results ---
-        for category, emojis in results_by_category.items():
-            header_row = Gtk.ListBoxRow(selectable=False)
-            header_row.get_style_context().add_class("category-header-row")
-            header_label = Gtk.Label(label=category, xalign=0)
-            header_label.get_style_context().add_class("category-header-label")
-            header_row.add(header_label)
-            yield header_row
-            
+            self._recent_rows = (header_row, emoji_row)
+            for row in self._recent_rows:
+                row.show_all()
+                row.set_visible(self._matches is None)
+                yield row
+
+        # --- Yield Widgets for every Category ---
+        for category, positions in SearchableEmojiSelector._category_positions.items():
+            header_row = self._create_header_row(category)
             emoji_row = Gtk.ListBoxRow(selectable=False)
-            emoji_row.add(self._create_emoji_flowbox(emojis))
+            # Stand-in of about the grid's height until the row is scrolled to
+            placeholder = Gtk.Box()
+            lines = -(-len(positions) // EMOJIS_PER_LINE)
+            placeholder.set_size_request(-1, lines * PLACEHOLDER_LINE_HEIGHT)
+            emoji_row.add(placeholder)
+            emoji_row.show_all()
+            header_row.show_all()
+            self._category_rows.append((positions, (header_row, emoji_row)))
+            self._unbuilt_sections.append((emoji_row, positions))
+
+            shown = self._section_is_shown(positions)
+            header_row.set_visible(shown)
+            emoji_row.set_visible(shown)
+            yield header_row
             yield emoji_row
+
+        self._no_results_row = Gtk.ListBoxRow(selectable=False)
+        label = Gtk.Label(label="No emojis found.")
+        label.get_style_context().add_class("no-results-label")
+        self._no_results_row.add(label)
+        self._no_results_row.show_all()
+        self._no_results_row.set_visible(self._matches is not None and not self._matches)
+        yield self._no_results_row
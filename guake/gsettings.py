@@ -98,6 +98,9 @@ class GSettingHandler:
         """If the gconf var use_trayicon be changed, this method will
         be called and will show/hide the trayicon.
         """
+        if self.guake.tray_icon is None:
+            # Not created yet, Guake._init_tray_icon applies the setting
+            return
         if hasattr(self.guake.tray_icon, "set_status"):
             self.guake.tray_icon.set_status(settings.get_boolean(key))
         else:
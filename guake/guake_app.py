@@ -28,8 +28,6 @@ import traceback
 import uuid
 
 from pathlib import Path
-from threading import Thread
-from time import sleep
 from urllib.parse import quote_plus
 from xml.sax.saxutils import escape as xml_escape
 
@@ -102,6 +100,8 @@ class Guake(SimpleGladeApp):
 
     """Guake main class. Handles specialy the main window."""
 
+    css_provider = None
+
     def __init__(self):
         def load_schema():
             log.info("Loading Gnome schema from: %s", SCHEMA_DIR)
@@ -118,58 +118,37 @@ class Guake(SimpleGladeApp):
             schema_source = load_schema()
         self.settings = Settings(schema_source)
         self.accel_group = None
-
-        if (
-            "schema-version" not in self.settings.general.keys()
-            or self.settings.general.get_string("schema-version") != guake_version()
-        ):
-            log.exception("Schema from old guake version detected, regenerating schema")
+        self._palette_cache = None
+        self._palette_cache_str = None
+        self._suspend_color_apply = False
+        self._color_apply_pending = False
+
+        # Once a version has started with an up to date schema, skip the check
+        schema_stamp = Path(GLib.get_user_cache_dir()) / "guake" / f"schema-{guake_version()}.ok"
+        if not schema_stamp.exists():
+            if (
+                "schema-version" not in self.settings.general.keys()
+                or self.settings.general.get_string("schema-version") != guake_version()
+            ):
+                log.exception("Schema from old guake version detected, regenerating schema")
+                try:
+                    try_to_compile_glib_schemas()
+                except subprocess.CalledProcessError:
+                    log.exception("Schema in non user-editable location, attempting to continue")
+                schema_source = load_schema()
+                self.settings = Settings(schema_source)
+                self.settings.general.set_string("schema-version", guake_version())
             try:
-                try_to_compile_glib_schemas()
-            except subprocess.CalledProcessError:
-                log.exception("Schema in non user-editable location, attempting to continue")
-            schema_source = load_schema()
-            self.settings = Settings(schema_source)
-            self.settings.general.set_string("schema-version", guake_version())
+                schema_stamp.parent.mkdir(parents=True, exist_ok=True)
+                schema_stamp.touch()
+            except OSError:
+                log.debug("Unable to write %s", schema_stamp)
 
         log.info("Language previously loaded from: %s", LOCALE_DIR)
 
         super().__init__(gladefile("guake.glade"))
 
-        # Add CSS provider for custom sidebar styling
-        css_provider = Gtk.CssProvider()
-        css_provider.load_from_data(
-            b"""
-        .sidebar {
-            background-color: #2E3436; /* Opaque dark color */
-        }
-        .sidebar GtkLabel, .sidebar .button {
-            color: #EEEEEC;
-        }
-        .sidebar .sidebar-title {
-            font-weight: bold;
-        }
-        .sidebar GtkListBoxRow:hover {
-            background-color: #555753;
-        }
-        .sidebar GtkListBoxRow:selected {
-            background-color: #4E9A06;
-        }
-        .sidebar .dim-label {
-            opacity: 0.7;
-            font-size: small;
-        }
-        .tab-activity-indicator {
-            animation: blinker 1.5s linear infinite;
-        }
-        @keyframes blinker {
-            50% { opacity: 0; }
-        }
-        """
-        )
-        Gtk.StyleContext.add_provider_for_screen(
-            Gdk.Screen.get_default(), css_provider, Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
-        )
+        self._install_css()
 
         select_gtk_theme(self.settings)
         patch_gtk_theme(self.get_widget("window-root").get_style_context(), self.settings)
@@ -189,38 +168,8 @@ class Guake(SimpleGladeApp):
         self.is_starting_up = True
         self.page_reorder_handler_id = None
 
-        # trayicon!
-        img = pixmapfile("guake-tray.png")
-        try:
-            try:
-                gi.require_version("AyatanaAppIndicator3", "0.1")
-                from gi.repository import (
-                    AyatanaAppIndicator3 as appindicator,
-                )
-            except (ValueError, ImportError):
-                gi.require_version("AppIndicator3", "0.1")
-                from gi.repository import (
-                    AppIndicator3 as appindicator,
-                )
-        except (ValueError, ImportError):
-            self.tray_icon = Gtk.StatusIcon()
-            self.tray_icon.set_from_file(img)
-            self.tray_icon.set_tooltip_text("Guake Terminal")
-            self.tray_icon.connect("popup-menu", self.show_menu)
-            self.tray_icon.connect("activate", self.show_hide)
-        else:
-            self.tray_icon = appindicator.Indicator.new(
-                "guake-indicator", "guake-tray", appindicator.IndicatorCategory.APPLICATION_STATUS
-            )
-            self.tray_icon.set_icon_full("guake-tray", "Guake Terminal")
-            self.tray_icon.set_status(appindicator.IndicatorStatus.ACTIVE)
-            menu = self.get_widget("tray-menu")
-            show = Gtk.MenuItem.new_with_label("Show")
-            show.set_sensitive(True)
-            show.connect("activate", self.show_hide)
-            show.show()
-            menu.prepend(show)
-            self.tray_icon.set_menu(menu)
+        # The tray icon is built once the main loop is idle, see _init_tray_icon
+        self.tray_icon = None
 
         self.display_tab_names = 0
 
@@ -243,6 +192,8 @@ class Guake(SimpleGladeApp):
 
         self.pending_restore_page_split = []
         self._failed_restore_page_split = []
+        # Terminal uuid -> terminal, filled as terminals are spawned
+        self._terminals_by_uuid = {}
 
         self.background_image_manager = BackgroundImageManager(self.window)
         self.fullscreen_manager = FullscreenManager(self.settings, self.window, self)
@@ -296,6 +247,8 @@ class Guake(SimpleGladeApp):
 
         self.window.set_type_hint(Gdk.WindowTypeHint.DOCK)
         self.window.set_type_hint(Gdk.WindowTypeHint.NORMAL)
+        # Repeated once the window is mapped, see show()
+        self._type_hint_toggled = False
 
         GSettingHandler(self)
         Keybinder.init()
@@ -344,10 +297,90 @@ class Guake(SimpleGladeApp):
             )
 
         GLib.timeout_add_seconds(1, self.update_tab_activity_indicators)
+        GLib.idle_add(self._init_tray_icon, priority=GLib.PRIORITY_LOW)
         
         log.info("Guake initialized")
         self.is_starting_up = False
 
+    @classmethod
+    def _install_css(cls):
+        # Custom sidebar styling, parsed once and shared screen-wide
+        if cls.css_provider is not None:
+            return
+        cls.css_provider = Gtk.CssProvider()
+        cls.css_provider.load_from_data(
+            b"""
+        .sidebar {
+            background-color: #2E3436; /* Opaque dark color */
+        }
+        .sidebar GtkLabel, .sidebar .button {
+            color: #EEEEEC;
+        }
+        .sidebar .sidebar-title {
+            font-weight: bold;
+        }
+        .sidebar GtkListBoxRow:hover {
+            background-color: #555753;
+        }
+        .sidebar GtkListBoxRow:selected {
+            background-color: #4E9A06;
+        }
+        .sidebar .dim-label {
+            opacity: 0.7;
+            font-size: small;
+        }
+        .tab-activity-indicator {
+            animation: blinker 1.5s linear infinite;
+        }
+        @keyframes blinker {
+            50% { opacity: 0; }
+        }
+        """
+        )
+        Gtk.StyleContext.add_provider_for_screen(
+            Gdk.Screen.get_default(), cls.css_provider, Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
+        )
+
+    def _init_tray_icon(self):
+        """Creates the tray icon. Loading the AppIndicator typelib is slow, so this
+        runs from an idle callback after the window is set up.
+        """
+        img = pixmapfile("guake-tray.png")
+        try:
+            try:
+                gi.require_version("AyatanaAppIndicator3", "0.1")
+                from gi.repository import (
+                    AyatanaAppIndicator3 as appindicator,
+                )
+            except (ValueError, ImportError):
+                gi.require_version("AppIndicator3", "0.1")
+                from gi.repository import (
+                    AppIndicator3 as appindicator,
+                )
+        except (ValueError, ImportError):
+            self.tray_icon = Gtk.StatusIcon()
+            self.tray_icon.set_from_file(img)
+            self.tray_icon.set_tooltip_text("Guake Terminal")
+            self.tray_icon.connect("popup-menu", self.show_menu)
+            self.tray_icon.connect("activate", self.show_hide)
+        else:
+            self.tray_icon = appindicator.Indicator.new(
+                "guake-indicator", "guake-tray", appindicator.IndicatorCategory.APPLICATION_STATUS
+            )
+            self.tray_icon.set_icon_full("guake-tray", "Guake Terminal")
+            self.tray_icon.set_status(appindicator.IndicatorStatus.ACTIVE)
+            menu = self.get_widget("tray-menu")
+            show = Gtk.MenuItem.new_with_label("Show")
+            show.set_sensitive(True)
+            show.connect("activate", self.show_hide)
+            show.show()
+            menu.prepend(show)
+            self.tray_icon.set_menu(menu)
+
+        # load_config ran before the icon existed, apply its visibility now
+        self.settings.general.triggerOnChangedValue(self.settings.general, "use-trayicon")
+        return False
+
     def get_notebook(self):
         return self.notebook_manager.get_current_notebook()
 
@@ -395,12 +428,18 @@ class Guake(SimpleGladeApp):
             self.window.set_visual(screen.get_system_visual())
 
     def _load_palette(self):
-        colorRGBA = Gdk.RGBA(0, 0, 0, 0)
-        paletteList = []
-        for color in self.settings.styleFont.get_string("palette").split(":"):
-            colorRGBA.parse(color)
-            paletteList.append(colorRGBA.copy())
-        return paletteList
+        # Parsing the ~18 colors is only redone when the palette setting changed;
+        # callers get copies since they adjust e.g. the background alpha
+        palette = self.settings.styleFont.get_string("palette")
+        if palette != self._palette_cache_str:
+            colorRGBA = Gdk.RGBA(0, 0, 0, 0)
+            paletteList = []
+            for color in palette.split(":"):
+                colorRGBA.parse(color)
+                paletteList.append(colorRGBA.copy())
+            self._palette_cache = paletteList
+            self._palette_cache_str = palette
+        return [color.copy() for color in self._palette_cache]
 
     def _get_background_color(self, palette_list):
         if len(palette_list) > 16:
@@ -410,7 +449,7 @@ class Guake(SimpleGladeApp):
         return self._apply_transparency_to_color(bg_color)
 
     def _apply_transparency_to_color(self, bg_color):
-        transparency = self.settings.styleBackground.get_int("transparency")
+        transparency = self.settings.styleBackground.getCachedValue("transparency")
         bg_color.alpha = 1 / 100 * transparency if not self.transparency_toggled else 1
         return bg_color
 
@@ -421,50 +460,60 @@ class Guake(SimpleGladeApp):
         palette_list = self._load_palette()
         return self._get_background_color(palette_list)
 
+    def _get_foreground_color(self, palette_list):
+        return palette_list[16] if len(palette_list) > 16 else Gdk.RGBA(0, 0, 0, 0)
+
     def get_fgcolor(self):
         palette_list = self._load_palette()
-        return palette_list[16] if len(palette_list) > 16 else Gdk.RGBA(0, 0, 0, 0)
+        return self._get_foreground_color(palette_list)
 
     def set_colors_from_settings(self, terminal_uuid=None):
-        bg_color = self.get_bgcolor()
-        font_color = self.get_fgcolor()
+        if self._suspend_color_apply:
+            self._color_apply_pending = True
+            return
         palette_list = self._load_palette()
-        terminals = self.get_notebook().iter_terminals()
+        bg_color = self._get_background_color(palette_list)
+        font_color = self._get_foreground_color(palette_list)
         if terminal_uuid:
-            terminals = [t for t in terminals if t.uuid == terminal_uuid]
+            terminal = self._get_terminal_by_uuid(terminal_uuid)
+            terminals = [terminal] if terminal else []
+        else:
+            terminals = self.get_notebook().iter_terminals()
         for i in terminals:
             i.set_color_foreground(font_color)
             i.set_color_bold(font_color)
             i.set_colors(font_color, bg_color, palette_list[:16])
 
     def set_colors_from_settings_on_page(self, current_terminal_only=False, page_num=None):
-        bg_color = self.get_bgcolor()
-        font_color = self.get_fgcolor()
         palette_list = self._load_palette()
+        bg_color = self._get_background_color(palette_list)
+        font_color = self._get_foreground_color(palette_list)
+        nb = self.get_notebook()
         if current_terminal_only:
-            terminal = self.get_notebook().get_current_terminal()
+            terminal = nb.get_current_terminal()
             terminal.set_color_foreground(font_color)
             terminal.set_color_bold(font_color)
             terminal.set_colors(font_color, bg_color, palette_list[:16])
         else:
             if page_num is None:
-                page_num = self.get_notebook().get_current_page()
-            for terminal in self.get_notebook().get_nth_page(page_num).iter_terminals():
+                page_num = nb.get_current_page()
+            page = nb.get_nth_page(page_num)
+            for terminal in page.iter_terminals():
                 terminal.set_color_foreground(font_color)
                 terminal.set_color_bold(font_color)
                 terminal.set_colors(font_color, bg_color, palette_list[:16])
 
     def reset_terminal_custom_colors(self, current_terminal=False, current_page=False, terminal_uuid=None):
+        nb = self.get_notebook()
         terminals = []
         if current_terminal:
-            terminals.append(self.get_notebook().get_current_terminal())
+            terminals.append(nb.get_current_terminal())
         if current_page:
-            page_num = self.get_notebook().get_current_page()
-            terminals.extend(self.get_notebook().get_nth_page(page_num).iter_terminals())
+            terminals.extend(nb.get_nth_page(nb.get_current_page()).iter_terminals())
         if terminal_uuid:
-            terminals.extend(t for t in self.get_notebook().iter_terminals() if t.uuid == terminal_uuid)
+            terminals.extend(t for t in nb.iter_terminals() if t.uuid == terminal_uuid)
         if not terminals:
-            terminals = list(self.get_notebook().iter_terminals())
+            terminals = list(nb.iter_terminals())
         for i in terminals:
             i.reset_custom_colors()
 
@@ -474,11 +523,11 @@ class Guake(SimpleGladeApp):
             c.parse("#" + bgcolor)
             bgcolor = c
         bgcolor = self._apply_transparency_to_color(bgcolor)
+        nb = self.get_notebook()
         if current_terminal_only:
-            self.get_notebook().get_current_terminal().set_color_background_custom(bgcolor)
+            nb.get_current_terminal().set_color_background_custom(bgcolor)
         else:
-            page_num = self.get_notebook().get_current_page()
-            for terminal in self.get_notebook().get_nth_page(page_num).iter_terminals():
+            for terminal in nb.get_nth_page(nb.get_current_page()).iter_terminals():
                 terminal.set_color_background_custom(bgcolor)
 
     def set_fgcolor(self, fgcolor, current_terminal_only=False):
@@ -486,11 +535,11 @@ class Guake(SimpleGladeApp):
             c = Gdk.RGBA()
             c.parse("#" + fgcolor)
             fgcolor = c
+        nb = self.get_notebook()
         if current_terminal_only:
-            self.get_notebook().get_current_terminal().set_color_foreground_custom(fgcolor)
+            nb.get_current_terminal().set_color_foreground_custom(fgcolor)
         else:
-            page_num = self.get_notebook().get_current_page()
-            for terminal in self.get_notebook().get_nth_page(page_num).iter_terminals():
+            for terminal in nb.get_nth_page(nb.get_current_page()).iter_terminals():
                 terminal.set_color_foreground_custom(fgcolor)
 
     def change_palette_name(self, palette_name):
@@ -507,18 +556,31 @@ class Guake(SimpleGladeApp):
         self.get_notebook().get_current_terminal().feed_child(command)
 
     def execute_command_by_uuid(self, tab_uuid, command):
-        if not command.endswith("\n"):
-            command += "\n"
+        # Encoded once for all the terminals of the page
+        payload = command.encode("utf-8")
+        if not payload.endswith(b"\n"):
+            payload += b"\n"
         try:
             tab_uuid = uuid.UUID(tab_uuid)
-            page_index = next(
-                index for index, t in enumerate(self.get_notebook().iter_terminals()) if t.get_uuid() == tab_uuid
-            )
-            terminals = self.get_notebook().get_terminals_for_page(page_index)
-            for current_vte in terminals:
-                current_vte.feed_child(command)
-        except (ValueError, StopIteration):
-            pass
+        except ValueError:
+            return
+        terminal = self._get_terminal_by_uuid(tab_uuid)
+        if not terminal:
+            return
+        nb = self.get_notebook()
+        page_index = nb.page_num(terminal.get_parent().get_root_box())
+        if page_index < 0:
+            return
+        for current_vte in nb.get_terminals_for_page(page_index):
+            current_vte.feed_child(payload)
+
+    def _get_terminal_by_uuid(self, terminal_uuid):
+        terminal = self._terminals_by_uuid.get(terminal_uuid)
+        if terminal is not None and terminal.get_parent() is None:
+            # Closed since it was spawned
+            del self._terminals_by_uuid[terminal_uuid]
+            terminal = None
+        return terminal
 
     def on_window_losefocus(self, window, event):
         if not HidePrevention(self.window).may_hide():
@@ -531,11 +593,11 @@ class Guake(SimpleGladeApp):
         if self.settings.general.get_boolean("lazy-losefocus"):
             self.lazy_losefocus_time = get_server_time(self.window)
             def losefocus_callback():
-                sleep(0.3)
                 if not (self.window.get_property("has-toplevel-focus") and (self.takefocus_time - self.lazy_losefocus_time) > 0):
                     if self.window.get_property("visible"):
-                        GLib.idle_add(hide_window_callback)
-            Thread(target=losefocus_callback, daemon=True).start()
+                        hide_window_callback()
+                return False
+            GLib.timeout_add(300, losefocus_callback)
         else:
             hide_window_callback()
 
@@ -619,8 +681,11 @@ class Guake(SimpleGladeApp):
         self.window.deiconify()
         self.window.show()
         self.window.get_window().focus(time)
-        self.window.set_type_hint(Gdk.WindowTypeHint.DOCK)
-        self.window.set_type_hint(Gdk.WindowTypeHint.NORMAL)
+        if not self._type_hint_toggled:
+            # The window manager only needs to see the hint change on the mapped window once
+            self.window.set_type_hint(Gdk.WindowTypeHint.DOCK)
+            self.window.set_type_hint(Gdk.WindowTypeHint.NORMAL)
+            self._type_hint_toggled = True
         self.settings.styleFont.triggerOnChangedValue(self.settings.styleFont, "color")
         self.settings.styleBackground.triggerOnChangedValue(self.settings.styleBackground, "color")
         self.restore_pending_terminal_split()
@@ -649,9 +714,17 @@ class Guake(SimpleGladeApp):
 
     def load_config(self, terminal_uuid=None):
         user_data = {"terminal_uuid": terminal_uuid} if terminal_uuid else {}
-        for s in [self.settings.general, self.settings.style, self.settings.styleFont, self.settings.styleBackground]:
-            for key in s.list_keys():
-                s.triggerOnChangedValue(s, key, user_data)
+        # Several keys end up in set_colors_from_settings, only repaint once.
+        self._suspend_color_apply = True
+        try:
+            for s in [self.settings.general, self.settings.style, self.settings.styleFont, self.settings.styleBackground]:
+                for key in s.list_keys():
+                    s.triggerOnChangedValue(s, key, user_data)
+        finally:
+            self._suspend_color_apply = False
+        if self._color_apply_pending:
+            self._color_apply_pending = False
+            self.set_colors_from_settings(terminal_uuid)
 
     def accel_search_terminal(self, *args):
         nb = self.get_notebook()
@@ -714,12 +787,12 @@ class Guake(SimpleGladeApp):
         return True
 
     def accel_increase_transparency(self, *args):
-        transparency = self.settings.styleBackground.get_int("transparency")
+        transparency = self.settings.styleBackground.getCachedValue("transparency")
         self.settings.styleBackground.set_int("transparency", max(transparency - 2, 0))
         return True
 
     def accel_decrease_transparency(self, *args):
-        transparency = self.settings.styleBackground.get_int("transparency")
+        transparency = self.settings.styleBackground.getCachedValue("transparency")
         self.settings.styleBackground.set_int("transparency", min(transparency + 2, MAX_TRANSPARENCY))
         return True
 
@@ -735,8 +808,9 @@ class Guake(SimpleGladeApp):
 
     @save_tabs_when_changed
     def add_tab(self, directory=None, open_tab_cwd=False):
-        position = 1 + self.get_notebook().get_current_page() if self.settings.general.get_boolean("new-tab-after") else None
-        self.get_notebook().new_page_with_focus(directory, position=position, open_tab_cwd=open_tab_cwd)
+        nb = self.get_notebook()
+        position = 1 + nb.get_current_page() if self.settings.general.get_boolean("new-tab-after") else None
+        nb.new_page_with_focus(directory, position=position, open_tab_cwd=open_tab_cwd)
 
     def add_tab_to_workspace(self, workspace_id):
         self.adding_tab_to_workspace_id = workspace_id
@@ -769,8 +843,9 @@ class Guake(SimpleGladeApp):
         return True
 
     def accel_move_tab_right(self, *args):
-        pos = self.get_notebook().get_current_page()
-        if pos < self.get_notebook().get_n_pages() - 1:
+        nb = self.get_notebook()
+        pos = nb.get_current_page()
+        if pos < nb.get_n_pages() - 1:
             self.move_tab(pos, pos + 1)
         return True
 
@@ -781,15 +856,22 @@ class Guake(SimpleGladeApp):
         nb.set_current_page(new_tab_pos)
 
     def gen_accel_switch_tabN(self, N):
-        return lambda *args: (self.get_notebook().set_current_page(N) if 0 <= N < self.get_notebook().get_n_pages() else None, True)[1]
+        def callback(*args):
+            nb = self.get_notebook()
+            if 0 <= N < nb.get_n_pages():
+                nb.set_current_page(N)
+            return True
+        return callback
 
     def accel_switch_tab_last(self, *args):
-        self.get_notebook().set_current_page(self.get_notebook().get_n_pages() - 1)
+        nb = self.get_notebook()
+        nb.set_current_page(nb.get_n_pages() - 1)
         return True
 
     def accel_rename_current_tab(self, *args):
-        page = self.get_notebook().get_nth_page(self.get_notebook().get_current_page())
-        self.get_notebook().get_tab_label(page).on_rename(None)
+        nb = self.get_notebook()
+        page = nb.get_nth_page(nb.get_current_page())
+        nb.get_tab_label(page).on_rename(None)
         return True
 
     def accel_quick_tab_navigation(self, *args):
@@ -864,9 +946,10 @@ class Guake(SimpleGladeApp):
     def recompute_tabs_titles(self):
         if not self.settings.general.get_boolean("use-vte-titles"):
             return
-        for terminal in self.get_notebook().iter_terminals():
-            page_num = self.get_notebook().page_num(terminal.get_parent())
-            self.get_notebook().rename_page(page_num, self.compute_tab_title(terminal), False)
+        nb = self.get_notebook()
+        for terminal in nb.iter_terminals():
+            page_num = nb.page_num(terminal.get_parent())
+            nb.rename_page(page_num, self.compute_tab_title(terminal), False)
 
     def load_cwd_guake_yaml(self, vte) -> dict:
         if not self.settings.general.get_boolean("load-guake-yml"):
@@ -923,8 +1006,9 @@ class Guake(SimpleGladeApp):
     def rename_tab_uuid(self, term_uuid, new_text, user_set=True):
         try:
             term_uuid = uuid.UUID(term_uuid)
-            page_index = next(i for i, t in enumerate(self.get_notebook().iter_terminals()) if t.get_uuid() == term_uuid)
-            self.get_notebook().rename_page(page_index, new_text, user_set)
+            nb = self.get_notebook()
+            page_index = next(i for i, t in enumerate(nb.iter_terminals()) if t.get_uuid() == term_uuid)
+            nb.rename_page(page_index, new_text, user_set)
         except (ValueError, StopIteration):
             pass
 
@@ -936,9 +1020,11 @@ class Guake(SimpleGladeApp):
             return -1
 
     def rename_current_tab(self, new_text, user_set=False):
-        self.get_notebook().rename_page(self.get_notebook().get_current_page(), new_text, user_set)
+        nb = self.get_notebook()
+        nb.rename_page(nb.get_current_page(), new_text, user_set)
 
     def terminal_spawned(self, notebook, terminal, pid):
+        self._terminals_by_uuid[terminal.uuid] = terminal
         self.load_config(terminal_uuid=terminal.uuid)
         terminal.handler_ids.append(terminal.connect("window-title-changed", self.on_terminal_title_changed, terminal))
         terminal.directory = terminal.get_current_directory()
@@ -972,6 +1058,7 @@ class Guake(SimpleGladeApp):
         current_term.search_get_gregex()
 
     def page_deleted(self, *args):
+        self._terminals_by_uuid = {u: t for u, t in self._terminals_by_uuid.items() if t.get_parent() is not None}
         if not self.get_notebook().has_page():
             self.hide()
             self.add_tab()
@@ -982,7 +1069,8 @@ class Guake(SimpleGladeApp):
         self.recompute_tabs_titles()
 
     def set_terminal_focus(self):
-        self.get_notebook().set_current_page(self.get_notebook().get_current_page())
+        nb = self.get_notebook()
+        nb.set_current_page(nb.get_current_page())
 
     def get_selected_uuidtab(self):
         return str(self.get_notebook().get_current_terminal().get_uuid())
@@ -107,19 +107,30 @@ class Settings:
     def enhanceSetting():
         def initEnhancements(self):
             self.listeners = {}
+            self.valueCache = {}
 
         def onChangedValue(self, key, user_func):
             if key not in self.listeners:
                 self.listeners[key] = []
             self.listeners[key].append(user_func)
 
+        def getCachedValue(self, key):
+            """Unpacked value of key, only read from GSettings again
+            after the key changed.
+            """
+            if key not in self.valueCache:
+                self.valueCache[key] = self.get_value(key).unpack()
+            return self.valueCache[key]
+
         def triggerOnChangedValue(self, settings, key, user_data=None):
+            self.valueCache.pop(key, None)
             if key in self.listeners:
                 for func in self.listeners[key]:
                     func(settings, key, user_data)
 
         gi.repository.Gio.Settings.initEnhancements = initEnhancements
         gi.repository.Gio.Settings.onChangedValue = onChangedValue
+        gi.repository.Gio.Settings.getCachedValue = getCachedValue
         gi.repository.Gio.Settings.triggerOnChangedValue = triggerOnChangedValue
 
     def compat():
@@ -149,16 +149,22 @@ class GuakeTerminal(Vte.Terminal):
         self._pid = pid
 
     def feed_child(self, resolved_cmdline):
+        # Callers feeding several terminals may pass already encoded bytes
         if (Vte.MAJOR_VERSION, Vte.MINOR_VERSION) >= (0, 42):
-            encoded = resolved_cmdline.encode("utf-8")
+            if isinstance(resolved_cmdline, bytes):
+                encoded = resolved_cmdline
+            else:
+                encoded = resolved_cmdline.encode("utf-8")
             try:
                 super().feed_child_binary(encoded)
+                return
             except TypeError:
-                # The doc doest not say clearly at which version the feed_child* function has lost
-                # the "len" parameter :(
-                super().feed_child(resolved_cmdline, len(resolved_cmdline))
-        else:
-            super().feed_child(resolved_cmdline, len(resolved_cmdline))
+                pass
+        if isinstance(resolved_cmdline, bytes):
+            resolved_cmdline = resolved_cmdline.decode("utf-8")
+        # The doc doest not say clearly at which version the feed_child* function has lost
+        # the "len" parameter :(
+        super().feed_child(resolved_cmdline, len(resolved_cmdline))
 
     def execute_command(self, command):
         if command[-1] != "\n":
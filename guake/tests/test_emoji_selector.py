@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=redefined-outer-name
+
+import json
+
+import pytest
+
+from guake.emoji_selector import SEARCH_NORMALIZATION
+from guake.emoji_selector import SearchableEmojiSelector
+
+EMOJIS = {
+    "Smileys & Emotion": {
+        "face-smiling": [
+            {"emoji": "😀", "name": "grinning face"},
+            {"emoji": "😄", "name": "grinning face with smiling eyes"},
+            {"emoji": "🙂", "name": "slightly smiling face"},
+        ],
+        "heart": [
+            {"emoji": "❤️", "name": "red heart"},
+            {"emoji": "💔", "name": "broken heart"},
+            {"emoji": "💚", "name": "green heart"},
+        ],
+    },
+    "Animals & Nature": {
+        "animal-mammal": [
+            {"emoji": "🐶", "name": "dog face"},
+            {"emoji": "🐱", "name": "cat face"},
+            {"emoji": "🦊", "name": "fox"},
+        ],
+        "plant-flower": [
+            {"emoji": "🌹", "name": "rose"},
+            {"emoji": "🌷", "name": "tulip"},
+        ],
+    },
+}
+
+
+@pytest.fixture
+def selector(mocker, tmp_path):
+    emoji_file = tmp_path / "emojis.json"
+    emoji_file.write_text(json.dumps({"emojis": EMOJIS}), encoding="utf-8")
+    mocker.patch.object(
+        SearchableEmojiSelector, "_index_cache_path", return_value=tmp_path / "emoji_index.pkl"
+    )
+    (emojis, index, ngrams, category_positions) = SearchableEmojiSelector._read_emoji_file(emoji_file)
+    mocker.patch.object(SearchableEmojiSelector, "_emoji_cache", emojis)
+    mocker.patch.object(SearchableEmojiSelector, "_search_index", index)
+    mocker.patch.object(SearchableEmojiSelector, "_ngram_index", ngrams)
+    mocker.patch.object(SearchableEmojiSelector, "_category_positions", category_positions)
+    # Only the search methods are exercised, the dialog itself is never built
+    s = SearchableEmojiSelector.__new__(SearchableEmojiSelector)
+    s._query_cache = {}
+    return s
+
+
+def _naive_positions(query):
+    tokens = query.lower().translate(SEARCH_NORMALIZATION).split()
+    return {
+        position
+        for position, (searchable_text, _, _) in enumerate(SearchableEmojiSelector._search_index)
+        if all(token in searchable_text for token in tokens)
+    }
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "e",
+        "z",
+        "he",
+        "fa",
+        "ace",
+        "red",
+        "xyz",
+        "heart",
+        "smiling",
+        "mammal",
+        "hearts",
+        "face-smiling",
+        "red heart",
+        "face cat",
+        "g he",
+        "smiling face eyes",
+        "heart dog",
+    ],
+)
+def test_match_positions_equals_naive_scan(selector, query):
+    assert selector._match_positions(query) == _naive_positions(query)
+
+
+def test_match_positions_refines_cached_query(selector):
+    for query in ["h", "he", "hea", "heart", "hearts"]:
+        assert selector._match_positions(query) == _naive_positions(query)
+    for query in ["gr", "gr he", "gree hea", "green heart"]:
+        assert selector._match_positions(query) == _naive_positions(query)
+    # Back to a query that is cached, and one that only a shorter one refines
+    assert selector._match_positions("he") == _naive_positions("he")
+    assert selector._match_positions("hear") == _naive_positions("hear")
+
+
+def test_match_positions_empty_query(selector):
+    assert selector._match_positions("") is None
+    assert selector._match_positions("   ") is None
@@ -241,3 +241,62 @@ def test_guake_compute_tab_title(mocker, g, fs):
     # Avoid loading the guake.yml
     mocker.patch.object(g.settings.general, "get_boolean", return_value=False)
     assert g.compute_tab_title(vte) == "Terminal"
+
+
+# Terminal lookup by uuid
+
+
+def test_get_terminal_by_uuid_after_spawn(g):
+    terminal = g.get_notebook().get_terminals_for_page(0)[0]
+    assert g._get_terminal_by_uuid(terminal.uuid) is terminal
+
+
+def test_get_terminal_by_uuid_after_page_closed(g):
+    g.add_tab()
+    nb = g.get_notebook()
+    assert nb.get_n_pages() == 2
+    terminal = nb.get_terminals_for_page(1)[0]
+    assert g._get_terminal_by_uuid(terminal.uuid) is terminal
+
+    nb.delete_page(1)
+    assert nb.get_n_pages() == 1
+    assert terminal.uuid not in g._terminals_by_uuid
+    assert g._get_terminal_by_uuid(terminal.uuid) is None
+
+
+def test_get_terminal_by_uuid_after_split(mocker, g):
+    nb = g.get_notebook()
+    first = nb.get_terminals_for_page(0)[0]
+    first.get_parent().split_v()
+    terminals = nb.get_terminals_for_page(0)
+    assert len(terminals) == 2
+    second = next(t for t in terminals if t is not first)
+    assert g._get_terminal_by_uuid(first.uuid) is first
+    assert g._get_terminal_by_uuid(second.uuid) is second
+
+    # A command sent to either pane goes to the whole page
+    for terminal in terminals:
+        mocker.patch.object(terminal, "feed_child")
+    g.execute_command_by_uuid(str(second.uuid), "ls")
+    for terminal in terminals:
+        terminal.feed_child.assert_called_once_with(b"ls\n")
+
+
+# Settings
+
+
+def test_cached_setting_refreshed_after_change(mocker, g):
+    style_background = g.settings.styleBackground
+    style_background.set_int("transparency", 40)
+    style_background.emit("changed", "transparency")
+    assert style_background.getCachedValue("transparency") == 40
+
+    # Served from the cache until the key changes
+    get_value = mocker.spy(style_background, "get_value")
+    assert style_background.getCachedValue("transparency") == 40
+    assert get_value.call_count == 0
+
+    style_background.set_int("transparency", 60)
+    style_background.emit("changed", "transparency")
+    assert style_background.getCachedValue("transparency") == 60
+    assert get_value.call_count >= 1